@@ -0,0 +1,204 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import cv2
+from imutils import paths
+import config
+from face_matcher import matcher_from_config
+from gallery_file import load_gallery
+from recognizer import FaceRecognizer
+from detectors import DETECTORS, detector_from_config
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".h264", ".webm", ".mjpeg")
+FIELDS = ["source", "frame", "top", "right", "bottom", "left", "name", "distance", "margin"]
+
+##############################
+# Worker process
+##############################
+# Each worker loads the (memory-mapped) gallery once and runs the same
+# FaceRecognizer detection/encoding/matching as the live recognizers, without
+# tracking. Frames are handed over `batch` at a time so the faces of several
+# photos or video frames are encoded together (FaceRecognizer.process_frames).
+_worker = {}
+
+def _init_worker(gallery_path, gallery_mode, cv_scaler, encoding_model, detector, batch):
+    cv2.setNumThreads(1)
+    gallery = load_gallery(gallery_path)
+    encodings, identities = gallery.select(gallery_mode)
+    matcher = matcher_from_config(encodings, gallery.names(), identity_ids=identities)
+    _worker["recognizer"] = FaceRecognizer(matcher, cv_scaler=cv_scaler, encoding_model=encoding_model,
+                                           detector=detector_from_config(detector), encode_batch_size=config.ENCODE_BATCH_SIZE)
+    _worker["batch"] = batch
+
+def _recognize(pending, rows, timings):
+    # pending = [(source, frame index, frame), ...]
+    if not pending:
+        return
+    recognizer = _worker["recognizer"]
+    results = recognizer.process_frames([frame for _, _, frame in pending])
+    for (source, frame_index, _), faces in zip(pending, results):
+        for face in faces:
+            top, right, bottom, left = (int(v) for v in face.box)
+            rows.append({"source": source, "frame": frame_index, "top": top, "right": right, "bottom": bottom,
+                         "left": left, "name": face.match.name, "distance": round(face.match.distance, 4),
+                         "margin": round(face.match.margin, 4) if face.match.margin not in (None, float("inf")) else None})
+    for stage, ms in recognizer.timings.items():
+        timings[stage] = timings.get(stage, 0.0) + ms
+    pending.clear()
+
+def process_task(task):
+    # task = ("images", [paths], 0, n) or ("video", path, first frame, frame count);
+    # returns (rows, stage timings, frames processed)
+    kind, path, start, count = task
+    rows = []
+    timings = {}
+    frames = 0
+    pending = []
+    if kind == "images":
+        for image_path in path:
+            t0 = time.perf_counter()
+            frame = cv2.imread(image_path)
+            timings["decode"] = timings.get("decode", 0.0) + (time.perf_counter() - t0) * 1000.0
+            if frame is not None:
+                pending.append((image_path, 0, frame))
+                frames += 1
+        _recognize(pending, rows, timings)
+        return rows, timings, frames
+
+    capture = cv2.VideoCapture(path)
+    if start:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    while count < 0 or frames < count:
+        t0 = time.perf_counter()
+        ok, frame = capture.read()
+        timings["decode"] = timings.get("decode", 0.0) + (time.perf_counter() - t0) * 1000.0
+        if not ok:
+            break
+        pending.append((path, start + frames, frame))
+        frames += 1
+        if len(pending) >= _worker["batch"]:
+            _recognize(pending, rows, timings)
+    _recognize(pending, rows, timings)
+    capture.release()
+    return rows, timings, frames
+
+##############################
+# Task list
+##############################
+def is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+def video_tasks(path, chunk):
+    capture = cv2.VideoCapture(path)
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    if total <= 0:
+        # Unknown length (e.g. raw h264): one worker reads it to the end
+        return [("video", path, 0, -1)]
+    return [("video", path, start, min(chunk, total - start)) for start in range(0, total, chunk)]
+
+def image_tasks(image_paths, batch):
+    return [("images", image_paths[i:i + batch], 0, len(image_paths[i:i + batch])) for i in range(0, len(image_paths), batch)]
+
+def build_tasks(inputs, chunk, batch=8):
+    tasks = []
+    for item in inputs:
+        if os.path.isdir(item):
+            tasks.extend(image_tasks(sorted(paths.list_images(item)), batch))
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if is_video(name):
+                        tasks.extend(video_tasks(os.path.join(root, name), chunk))
+        elif is_video(item):
+            tasks.extend(video_tasks(item, chunk))
+        elif os.path.isfile(item):
+            tasks.extend(image_tasks([item], batch))
+        else:
+            print(f"[WARN] Skipping {item}: not found", file=sys.stderr)
+    return tasks
+
+##############################
+# Output
+##############################
+class ResultWriter:
+    def __init__(self, output, fmt):
+        self.file = sys.stdout if output == "-" else open(output, "w", newline="")
+        self.fmt = fmt
+        if fmt == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == "csv":
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+##############################
+# Main Execution
+##############################
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch face recognition for image folders and video files")
+    parser.add_argument("inputs", nargs="+", help="Image folders, image files or video files")
+    parser.add_argument("--output", "-o", default="-", help="Result file (.jsonl or .csv), '-' for stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Default: from the output extension, else jsonl")
+    parser.add_argument("--gallery", default=config.GALLERY_PATH)
+    parser.add_argument("--gallery-mode", default=config.GALLERY_MODE, choices=["full", "prototype"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cv-scaler", type=int, default=1, help="Detection downscale (archived photos are usually small)")
+    parser.add_argument("--model", default="large", choices=["small", "large"], help="Landmark model used for encoding")
+    parser.add_argument("--detector", default=config.DETECTOR, choices=sorted(DETECTORS))
+    parser.add_argument("--chunk", type=int, default=64, help="Video frames per task")
+    parser.add_argument("--batch", type=int, default=8, help="Images per task / video frames encoded together")
+    parser.add_argument("--summary", help="Also write the timing summary as JSON to this file")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    tasks = build_tasks(args.inputs, args.chunk, args.batch)
+    print(f"[BATCH] {len(tasks)} tasks, {args.workers} workers", file=sys.stderr)
+
+    writer = ResultWriter(args.output, fmt)
+    totals = {}
+    frames = 0
+    faces = 0
+    start = time.perf_counter()
+    init_args = (args.gallery, args.gallery_mode, args.cv_scaler, args.model, args.detector, args.batch)
+    with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=init_args) as pool:
+        # imap keeps task order, so rows are written in input/frame order as they complete
+        for done, (rows, timings, count) in enumerate(pool.imap(process_task, tasks), start=1):
+            for row in rows:
+                writer.write(row)
+            frames += count
+            faces += len(rows)
+            for stage, ms in timings.items():
+                totals[stage] = totals.get(stage, 0.0) + ms
+            if done % 50 == 0 or done == len(tasks):
+                print(f"[BATCH] {done}/{len(tasks)} tasks, {frames} frames, {faces} faces", file=sys.stderr)
+    writer.close()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "frames": frames,
+        "faces": faces,
+        "workers": args.workers,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "stage_ms_per_frame": {stage: round(ms / frames, 2) for stage, ms in sorted(totals.items())} if frames else {},
+    }
+    print(f"[BATCH] {frames} frames, {faces} faces in {elapsed:.1f}s ({summary['fps']} frames/s)", file=sys.stderr)
+    for stage, ms in summary["stage_ms_per_frame"].items():
+        print(f"[BATCH]   {stage:<8} {ms:8.2f} ms/frame (per worker)", file=sys.stderr)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import numpy as np
+from gallery_index import build_index
+
+##############################
+# Helpers
+##############################
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def synthetic_gallery(n_encodings, per_identity=5, seed=0):
+    # Identity centres ~0.9 apart and samples ~0.4 from their centre, roughly
+    # the spread of real dlib encodings (same person < 0.6 < different people)
+    rng = np.random.default_rng(seed)
+    n_ids = max(1, n_encodings // per_identity)
+    centres = rng.normal(0, 0.9 / np.sqrt(256), (n_ids, 128)).astype(np.float32)
+    labels = np.arange(n_encodings) % n_ids
+    encodings = centres[labels] + rng.normal(0, 0.4 / np.sqrt(256), (n_encodings, 128)).astype(np.float32)
+    return encodings, labels, centres
+
+def synthetic_queries(centres, n_queries, seed=1):
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, len(centres), n_queries)
+    return centres[labels] + rng.normal(0, 0.4 / np.sqrt(256), (n_queries, 128)).astype(np.float32)
+
+def time_calls(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def summarize(times, per=1):
+    ms = np.array(times) * 1000.0 / per
+    return {"mean_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95))}
+
+##############################
+# Gallery index: recall vs latency
+##############################
+def bench_index(args):
+    results = []
+    for size in args.sizes:
+        encodings, _, centres = synthetic_gallery(size)
+        queries = synthetic_queries(centres, args.queries)
+        exact = build_index(encodings, "exact")
+        truth, _ = exact.search(queries, k=1)
+        exact_times = time_calls(lambda: [exact.search(q[None], k=1) for q in queries], args.repeat)
+        results.append({"backend": "exact", "size": size, "recall@1": 1.0,
+                        "query": summarize(exact_times, per=len(queries)), "build_s": 0.0})
+        print(f"[BENCH] exact size={size} {results[-1]['query']['mean_ms']:.3f} ms/query")
+
+        for nlist in args.nlist or [None]:
+            start = time.perf_counter()
+            ivf = build_index(encodings, "ivf", nlist=nlist)
+            build_s = time.perf_counter() - start
+            for nprobe in args.nprobe:
+                ivf.nprobe = nprobe
+                found, _ = ivf.search(queries, k=1)
+                recall = float((found[:, 0] == truth[:, 0]).mean())
+                ivf_times = time_calls(lambda: [ivf.search(q[None], k=1) for q in queries], args.repeat)
+                results.append({"backend": "ivf", "size": size, "nlist": ivf.nlist, "nprobe": nprobe,
+                                "recall@1": recall, "query": summarize(ivf_times, per=len(queries)), "build_s": build_s})
+                print(f"[BENCH] ivf size={size} nlist={ivf.nlist} nprobe={nprobe} "
+                      f"recall@1={recall:.3f} {results[-1]['query']['mean_ms']:.3f} ms/query")
+    return results
+
+##############################
+# Detection: detector backends at different downscales
+##############################
+def dataset_samples(args):
+    # [(person name, RGB image), ...]; the name is the dataset/<name>/ folder
+    from imutils import paths
+    import cv2
+    samples = []
+    for image_path in sorted(paths.list_images(args.dataset))[:args.images]:
+        image = cv2.imread(image_path)
+        if image is not None:
+            samples.append((os.path.basename(os.path.dirname(image_path)), cv2.cvtColor(image, cv2.COLOR_BGR2RGB)))
+    if not samples:
+        raise SystemExit(f"No images found in {args.dataset}")
+    return samples
+
+def dataset_images(args):
+    return [image for _, image in dataset_samples(args)]
+
+def bench_detect(args):
+    # Speed per backend and cv_scaler. Accuracy is measured against the reference
+    # detector run on the full-resolution photos (dlib CNN by default, the most
+    # accurate one): a reference face counts as found if a detection overlaps it
+    # with IoU >= 0.3 (backends draw boxes of slightly different shapes).
+    #
+    # The gallery is trained with TRAIN_DETECTOR boxes, so each backend's faces are
+    # also encoded (from the downscaled image, like the live recognizers) and compared
+    # with the gallery encodings of the same face: `drift` is the distance between the
+    # two, `identified` the share of faces whose nearest gallery face from *another*
+    # photo is the right person within MATCH_TOLERANCE.
+    import cv2
+    import config
+    from detectors import build_detector
+    from encoding import BatchEncoder
+    from tracking import iou
+    samples = dataset_samples(args)
+    names = np.array([name for name, _ in samples])
+    images = [image for _, image in samples]
+    reference_detector = build_detector(args.reference, **config.DETECTOR_PARAMS.get(args.reference, {}))
+    reference = [reference_detector.detect(image) for image in images]
+    n_reference = sum(len(boxes) for boxes in reference)
+    encoder = BatchEncoder(batch_size=config.ENCODE_BATCH_SIZE)
+    gallery_detector = build_detector(config.TRAIN_DETECTOR, **config.DETECTOR_PARAMS.get(config.TRAIN_DETECTOR, {}))
+    gallery_boxes = [gallery_detector.detect(image) for image in images]
+    gallery = encoder.encode_many(list(zip(images, gallery_boxes)))
+    gallery_matrix = np.array([e for encodings in gallery for e in encodings], dtype=np.float32).reshape(-1, 128)
+    gallery_image = np.array([i for i, encodings in enumerate(gallery) for _ in encodings])
+    results = []
+    for name in args.detectors:
+        try:
+            detector = build_detector(name, **config.DETECTOR_PARAMS.get(name, {}))
+        except Exception as e:
+            # No silent fallback here, the numbers must belong to the named backend
+            print(f"[BENCH] skipping {name}: {e}")
+            continue
+        for scaler in args.scalers:
+            small = [cv2.resize(image, (0, 0), fx=1/scaler, fy=1/scaler) for image in images]
+            small_found = [detector.detect(image) for image in small]
+            found = [[tuple(v * scaler for v in box) for box in boxes] for boxes in small_found]
+            hits = sum(sum(1 for ref in refs if any(iou(ref, box) >= 0.3 for box in boxes))
+                       for refs, boxes in zip(reference, found))
+            detections = sum(len(boxes) for boxes in found)
+            drift, identified, compared = [], 0, 0
+            for i, encodings in enumerate(encoder.encode_many(list(zip(small, small_found)))):
+                for box, encoding in zip(found[i], encodings):
+                    overlaps = [iou(box, g) for g in gallery_boxes[i]]
+                    if not overlaps or max(overlaps) < 0.3:
+                        continue
+                    compared += 1
+                    own = np.flatnonzero(gallery_image == i)[int(np.argmax(overlaps))]
+                    drift.append(float(np.linalg.norm(gallery_matrix[own] - encoding)))
+                    others = np.flatnonzero(gallery_image != i)
+                    if others.size:
+                        distances = np.linalg.norm(gallery_matrix[others] - encoding, axis=1)
+                        best = others[int(np.argmin(distances))]
+                        if distances.min() <= config.MATCH_TOLERANCE and names[gallery_image[best]] == names[i]:
+                            identified += 1
+            times = time_calls(lambda: [detector.detect(image) for image in small], args.repeat)
+            results.append({"detector": name, "cv_scaler": scaler, "images": len(small), "detections": detections,
+                            "reference": args.reference, "reference_faces": n_reference,
+                            "recall": hits / n_reference if n_reference else None,
+                            "precision": hits / detections if detections else None,
+                            "gallery_detector": config.TRAIN_DETECTOR, "compared_faces": compared,
+                            "drift_mean": float(np.mean(drift)) if drift else None,
+                            "drift_p95": float(np.percentile(drift, 95)) if drift else None,
+                            "identified": identified / compared if compared else None,
+                            "per_image": summarize(times, per=len(small))})
+            r = results[-1]
+            print(f"[BENCH] detect {name} cv_scaler={scaler} recall={r['recall'] or 0:.2f} "
+                  f"precision={r['precision'] or 0:.2f} drift={r['drift_mean'] or 0:.3f} "
+                  f"identified={r['identified'] or 0:.2f} {r['per_image']['mean_ms']:.1f} ms/image")
+    return results
+
+##############################
+# Encoding: small (5-point) vs large (68-point) landmark model
+##############################
+def bench_encode(args):
+    # face_recognition.face_encodings per image vs BatchEncoder over all images at once
+    import face_recognition
+    from encoding import BatchEncoder
+    images = dataset_images(args)
+    boxes = [face_recognition.face_locations(image) for image in images]
+    n_faces = sum(len(b) for b in boxes)
+    if n_faces == 0:
+        raise SystemExit("No faces found in the dataset images")
+    results = []
+    for model in ("small", "large"):
+        encoder = BatchEncoder(model=model, batch_size=args.batch_size)
+        runs = {
+            "per_image": lambda: [face_recognition.face_encodings(image, b, model=model) for image, b in zip(images, boxes)],
+            "batched": lambda: encoder.encode_many(list(zip(images, boxes))),
+        }
+        for mode, run in runs.items():
+            times = time_calls(run, args.repeat)
+            results.append({"model": model, "mode": mode, "faces": n_faces, "faces_per_s": n_faces / float(np.mean(times)),
+                            "per_face": summarize(times, per=n_faces)})
+            print(f"[BENCH] encode model={model} {mode} {results[-1]['per_face']['mean_ms']:.1f} ms/face "
+                  f"({results[-1]['faces_per_s']:.1f} faces/s)")
+    return results
+
+##############################
+# Matching: FaceMatcher cost vs gallery size
+##############################
+def bench_match(args):
+    from face_matcher import FaceMatcher
+    results = []
+    for size in args.sizes:
+        encodings, labels, centres = synthetic_gallery(size)
+        names = [f"person_{label}" for label in labels]
+        frames = [synthetic_queries(centres, args.faces_per_frame, seed=i) for i in range(args.frames)]
+        for backend in args.backends:
+            start = time.perf_counter()
+            matcher = FaceMatcher(encodings, names, backend=backend)
+            build_s = time.perf_counter() - start
+            times = time_calls(lambda: [matcher.match(frame) for frame in frames], args.repeat)
+            results.append({"backend": backend, "size": size, "faces_per_frame": args.faces_per_frame,
+                            "build_s": build_s, "per_frame": summarize(times, per=len(frames))})
+            print(f"[BENCH] match backend={backend} size={size} {results[-1]['per_frame']['mean_ms']:.3f} ms/frame")
+    return results
+
+##############################
+# Gallery load: encodings.pickle vs binary gallery file
+##############################
+def bench_load(args):
+    import pickle
+    import tempfile
+    from gallery_file import save_gallery, Gallery
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            encodings, labels, _ = synthetic_gallery(size)
+            names = [f"person_{label}" for label in labels]
+            # Same shape as the old training output: a list of float64 arrays plus parallel lists
+            data = {"encodings": [e.astype(np.float64) for e in encodings], "names": names,
+                    "ages": ["30"] * size, "occupations": ["Engineer"] * size}
+            pickle_path = os.path.join(tmp, f"{size}.pickle")
+            gallery_path = os.path.join(tmp, f"{size}.gallery")
+            with open(pickle_path, "wb") as f:
+                f.write(pickle.dumps(data))
+            save_gallery(gallery_path, encodings, names, data["ages"], data["occupations"])
+
+            def load_pickle():
+                with open(pickle_path, "rb") as f:
+                    pickle.loads(f.read())
+
+            pickle_times = time_calls(load_pickle, args.repeat)
+            gallery_times = time_calls(lambda: Gallery(gallery_path), args.repeat)
+            results.append({"format": "pickle", "size": size, "bytes": os.path.getsize(pickle_path), "load": summarize(pickle_times)})
+            results.append({"format": "gallery", "size": size, "bytes": os.path.getsize(gallery_path), "load": summarize(gallery_times)})
+            print(f"[BENCH] load size={size} pickle {results[-2]['load']['mean_ms']:.1f} ms, "
+                  f"gallery {results[-1]['load']['mean_ms']:.1f} ms")
+    return results
+
+##############################
+# Training throughput vs worker count
+##############################
+def bench_train(args):
+    from imutils import paths
+    from training import encode_images
+    image_paths = sorted(paths.list_images(args.dataset))
+    if not image_paths:
+        raise SystemExit(f"No images found in {args.dataset}")
+    # Repeat the dataset so every worker count has enough images to keep the pool busy
+    sources = (image_paths * (args.images // len(image_paths) + 1))[:args.images]
+    results = []
+    for workers in args.workers:
+        times = time_calls(lambda: list(encode_images(sources, workers)), args.repeat)
+        mean_s = float(np.mean(times))
+        results.append({"workers": workers, "images": len(sources), "images_per_s": len(sources) / mean_s,
+                        "per_image": summarize(times, per=len(sources))})
+        print(f"[BENCH] train workers={workers} {results[-1]['images_per_s']:.2f} images/s")
+    return results
+
+##############################
+# Main Execution
+##############################
+SUITES = {
+    "index": bench_index,
+    "detect": bench_detect,
+    "encode": bench_encode,
+    "match": bench_match,
+    "load": bench_load,
+    "train": bench_train,
+}
+
+# Suite-specific options; "all" accepts every one of them
+ARGUMENTS = {
+    "sizes": (["--sizes"], dict(type=int, nargs="+", default=[1000, 10000, 100000], help="Synthetic gallery sizes")),
+    "queries": (["--queries"], dict(type=int, default=200)),
+    "nlist": (["--nlist"], dict(type=int, nargs="+", help="IVF list counts to try (default sqrt(N))")),
+    "nprobe": (["--nprobe"], dict(type=int, nargs="+", default=[1, 4, 8, 16, 32])),
+    "dataset": (["--dataset"], dict(default="dataset")),
+    "images": (["--images"], dict(type=int, default=200, help="Max images used from the dataset")),
+    "scalers": (["--scalers"], dict(type=int, nargs="+", default=[1, 2, 4])),
+    "detectors": (["--detectors"], dict(nargs="+", default=["hog", "haar", "yunet"], help="Backends from detectors.py")),
+    "reference": (["--reference"], dict(default="cnn", help="Detector used as ground truth (run at full resolution)")),
+    "backends": (["--backends"], dict(nargs="+", default=["exact", "ivf"])),
+    "faces_per_frame": (["--faces-per-frame"], dict(type=int, default=2)),
+    "frames": (["--frames"], dict(type=int, default=50)),
+    "batch_size": (["--batch-size"], dict(type=int, default=32, help="Faces per batched encoder call")),
+    "workers": (["--workers"], dict(type=int, nargs="+", default=[1, 2, 4])),
+}
+SUITE_ARGUMENTS = {
+    "index": ["sizes", "queries", "nlist", "nprobe"],
+    "detect": ["dataset", "images", "scalers", "detectors", "reference"],
+    "encode": ["dataset", "images", "batch_size"],
+    "match": ["sizes", "backends", "faces_per_frame", "frames"],
+    "load": ["sizes"],
+    "train": ["dataset", "images", "workers"],
+}
+HELP = {
+    "index": "Recall vs latency of the gallery index backends on synthetic encodings",
+    "detect": "Speed, recall/precision and encoding drift vs the training detector of the detector backends",
+    "encode": "Per-image vs batched encoding with the small and large landmark model",
+    "match": "FaceMatcher time per frame vs gallery size",
+    "load": "encodings.pickle vs binary gallery file load time",
+    "train": "Training throughput vs process pool size",
+    "all": "Run every suite",
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Face recognition benchmarks (results are written as JSON)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--repeat", type=int, default=3)
+    sub = parser.add_subparsers(dest="suite", required=True)
+    for suite in list(SUITES) + ["all"]:
+        p = sub.add_parser(suite, help=HELP[suite])
+        names = ARGUMENTS if suite == "all" else SUITE_ARGUMENTS[suite]
+        for name in names:
+            flags, options = ARGUMENTS[name]
+            p.add_argument(*flags, **options)
+
+    args = parser.parse_args()
+    report = {
+        "suite": args.suite,
+        "commit": git_commit(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": ({suite: run(args) for suite, run in SUITES.items()} if args.suite == "all"
+                    else SUITES[args.suite](args)),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"[BENCH] Report written to {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import config
+
+##############################
+# Content-addressed image store
+##############################
+# Image bytes live on local disk under their SHA-256, sharded into two levels
+# of directories (blobs/ab/cd/abcd...) so no folder grows too large. The
+# database only keeps the hash next to the image metadata. Storing the same
+# photo twice writes one file, and because the hash is the same one training
+# records in trained_images, an identical photo is never encoded again.
+# Files are written to a temporary name, fsynced and renamed into place, and
+# the directories are fsynced too, so readers never see a partial blob and a
+# blob that put() returned for survives a power cut.
+class BlobStore:
+    def __init__(self, root="blobs", depth=2):
+        self.root = root
+        self.depth = depth
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def hash(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, content_hash):
+        shards = [content_hash[i * 2:i * 2 + 2] for i in range(self.depth)]
+        return os.path.join(self.root, *shards, content_hash)
+
+    def put(self, data):
+        # Returns the SHA-256 hex digest of `data`; nothing is written if it is already stored
+        content_hash = self.hash(data)
+        path = self.path(content_hash)
+        directory = os.path.dirname(path)
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        # The rename and any newly created shard directories live in their parents' entries.
+        # Also done for an existing file: it may come from a put() interrupted before this point.
+        while True:
+            _fsync_dir(directory)
+            if os.path.samefile(directory, self.root):
+                break
+            directory = os.path.dirname(directory)
+        return content_hash
+
+    def get(self, content_hash):
+        with open(self.path(content_hash), "rb") as f:
+            return f.read()
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def map_file(path):
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+# === Build the store with the settings from config.py ===
+def blob_store_from_config():
+    return BlobStore(root=config.BLOB_STORE_DIR)
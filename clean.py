@@ -10,7 +10,7 @@ def clear_all_tables(host, user, password, database):
         cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
 
         # List of tables to clear
-        tables = ['images', 'encodings', 'persons']  # Order matters due to foreign key dependencies
+        tables = ['face_encodings', 'trained_images', 'images', 'persons']  # Order matters due to foreign key dependencies
 
         for table in tables:
             cursor.execute(f"TRUNCATE TABLE {table}")
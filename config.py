@@ -0,0 +1,138 @@
+# === Recognition settings shared by main_app.py and the standalone scripts ===
+
+# Maximum face distance that still counts as a match (same as face_recognition.compare_faces)
+MATCH_TOLERANCE = 0.6
+
+# === Gallery index ===
+# "exact" scans every known encoding, "ivf" only probes the nearest clusters.
+# Switch to "ivf" once the gallery grows past a few tens of thousands of encodings;
+# run `python benchmark.py index` to pick nlist / nprobe for your gallery size.
+INDEX_BACKEND = "exact"
+INDEX_PARAMS = {
+    "ivf": {"nlist": None, "nprobe": 8},  # nlist=None -> sqrt(N)
+}
+
+# === Face detector ===
+# hog, cnn (dlib), haar (OpenCV cascade) or yunet (OpenCV DNN, needs the ONNX model in models/).
+# DETECTOR is used by the live recognizers and batch_recognize.py, TRAIN_DETECTOR when
+# training. Run `python benchmark.py detect` to compare speed and accuracy on your photos;
+# its drift/identified columns show whether a backend's faces still match a gallery trained
+# with TRAIN_DETECTOR before switching DETECTOR away from it.
+DETECTOR = "hog"
+TRAIN_DETECTOR = "hog"
+DETECTOR_PARAMS = {
+    "hog": {"upsample": 1},
+    "cnn": {"upsample": 1},
+    "haar": {"scale_factor": 1.1, "min_neighbors": 5, "min_size": 20},
+    "yunet": {"model_path": "models/face_detection_yunet_2023mar.onnx", "score_threshold": 0.8},
+}
+
+# === Gallery mode ===
+# "full" matches against every training photo, "prototype" only against up to
+# MAX_PROTOTYPES medoids per person (computed at training time). Faces further than
+# PROTOTYPE_OUTLIER_DISTANCE from their person's medoid are dropped as outliers.
+GALLERY_MODE = "full"
+MAX_PROTOTYPES = 3
+PROTOTYPE_OUTLIER_DISTANCE = 0.6
+
+# === Training ===
+# Number of processes used to decode/detect/encode images (None -> all cores)
+TRAIN_WORKERS = None
+# Faces encoded per ResNet call (training, batch recognition and multi-face frames)
+ENCODE_BATCH_SIZE = 32
+
+# === Gallery file ===
+# Written by model_training.py / the Train page, memory-mapped by the standalone recognizers
+GALLERY_PATH = "encodings.gallery"
+
+# === Tracking ===
+# Run full detection + encoding only every DETECT_EVERY frames (or when a track is lost)
+# and carry boxes and their identity labels with optical flow in between.
+TRACKING = True
+DETECT_EVERY = 5
+# A track that stays within IDENTITY_MOVE_IOU of its last identified box reuses that identity
+# for up to IDENTITY_TTL seconds; identities are a majority vote over IDENTITY_VOTE_WINDOW matches.
+IDENTITY_TTL = 2.0
+IDENTITY_MOVE_IOU = 0.6
+IDENTITY_VOTE_WINDOW = 5
+# A first match this close is trusted (and announced) without waiting for a second vote
+IDENTITY_CONFIDENT_DISTANCE = 0.45
+
+# === Frame source ===
+# picamera, camera:<index>, video:<path>, images:<dir> or synthetic (see frame_sources.py).
+# SOURCE_FPS throttles recorded sources; None replays as fast as possible.
+FRAME_SOURCE = "picamera"
+SOURCE_FPS = None
+
+# === Latency metrics ===
+# Rolling p50/p95/p99 per stage over the last METRICS_WINDOW frames, logged every
+# METRICS_LOG_INTERVAL seconds (0 disables). METRICS_PORT serves them as Prometheus
+# text on http://127.0.0.1:<port>/metrics (None disables).
+METRICS_WINDOW = 500
+METRICS_LOG_INTERVAL = 10.0
+METRICS_PORT = None
+
+# === Adaptive detection scale ===
+# Re-choose the detection downscale on every detection frame so the loop holds TARGET_FPS,
+# going coarser while the smallest recent face stays at least MIN_FACE_SIZE pixels tall.
+# The recognizers' cv_scaler is only the starting point when ADAPTIVE_SCALE is on.
+ADAPTIVE_SCALE = True
+TARGET_FPS = 10.0
+SCALER_LEVELS = (1, 1.5, 2, 3, 4, 6)
+MIN_FACE_SIZE = 48
+# Encode faces from a crop of the full-resolution frame instead of the downscaled one
+FULL_RES_ENCODING = True
+
+# === Region-of-interest detection ===
+# Only search windows around the previous faces (grown by ROI_MARGIN of the face size per side);
+# scan the whole frame every ROI_FULL_SCAN_EVERY detections or when motion appears outside them.
+# Windows smaller than ROI_MIN_SIZE pixels are upscaled to it (HOG cannot find faces in smaller
+# crops), and a window that loses its face is followed by a full scan of the same frame.
+ROI_DETECTION = True
+ROI_MARGIN = 0.5
+ROI_MIN_SIZE = 80
+ROI_FULL_SCAN_EVERY = 10
+# Motion = more than MOTION_MIN_AREA of a small thumbnail changing by more than MOTION_THRESHOLD grey levels
+MOTION_THRESHOLD = 25
+MOTION_MIN_AREA = 0.01
+
+# === Motion gate ===
+# Skip recognition while the scene is static: after GATE_HOLD seconds without motion the
+# recognizers go idle, only check for motion GATE_IDLE_FPS times a second and run one
+# recognition pass every GATE_RECHECK seconds. Motion wakes them up on the next frame.
+MOTION_GATE = True
+GATE_HOLD = 2.0
+GATE_RECHECK = 5.0
+GATE_IDLE_FPS = 4.0
+
+# === Speech ===
+# Each person is announced at most once per SPEECH_COOLDOWN seconds. At most SPEECH_MAX_BACKLOG
+# announcements wait in the queue (the oldest is dropped) and none is spoken more than
+# SPEECH_MAX_AGE seconds late. Audio is synthesized once per message into SPEECH_CACHE_DIR and
+# played with SPEECH_PLAYER (None disables the cache and speaks directly with pyttsx3).
+SPEECH_RATE = 150
+SPEECH_COOLDOWN = 30.0
+SPEECH_MAX_BACKLOG = 3
+SPEECH_MAX_AGE = 10.0
+SPEECH_CACHE_DIR = "tts_cache"
+SPEECH_PLAYER = "aplay"
+
+# === Database ===
+# Connections in the MySQL pool shared by the UI, training and scraper threads
+DB_POOL_SIZE = 5
+# Image rows fetched per page when training streams blobs out of MySQL
+DB_FETCH_BATCH = 32
+
+# === Image store ===
+# Directory of the content-addressed image store (files sharded by SHA-256)
+BLOB_STORE_DIR = "blobs"
+# Decode training images from a memory map of the stored file instead of reading it into bytes
+TRAIN_MMAP = True
+
+# === Enrollment ===
+# New photos of a person are skipped when their dHash is within DEDUP_DHASH_DISTANCE
+# bits (of 64) of a stored photo of that person, or when every face in them is within
+# DEDUP_ENCODING_DISTANCE of a stored face (same-person photos are usually 0.3-0.5 apart)
+DEDUP_DHASH_DISTANCE = 6
+DEDUP_ENCODING_DISTANCE = 0.2
+DEDUP_CHECK_ENCODINGS = True
@@ -31,28 +31,50 @@ def create_database_and_tables(host, user, password, database):
         """)
         print("Table 'persons' created or already exists.")
 
-        # Create 'images' table
+        # Create 'images' table: the bytes live in the blob store (blob_store.py), the row keeps their SHA-256
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS images (
             id INT AUTO_INCREMENT PRIMARY KEY,
             person_id INT,
             filename VARCHAR(255),
             image LONGBLOB,
+            content_hash CHAR(64),
+            phash BIGINT UNSIGNED,
             timestamp DATETIME,
+            INDEX (content_hash),
             FOREIGN KEY (person_id) REFERENCES persons(id)
         )
         """)
         print("Table 'images' created or already exists.")
 
-        # Create 'encodings' table for storing model data
+        # Create 'face_encodings' table: one row per face, packed float32 encoding + bounding box
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS encodings (
+        CREATE TABLE IF NOT EXISTS face_encodings (
             id INT AUTO_INCREMENT PRIMARY KEY,
-            data LONGBLOB,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            image_id INT NOT NULL,
+            person_id INT NOT NULL,
+            encoding VARBINARY(512) NOT NULL,
+            box_top INT,
+            box_right INT,
+            box_bottom INT,
+            box_left INT,
+            is_prototype TINYINT(1) NOT NULL DEFAULT 0,
+            INDEX (image_id),
+            FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE,
+            FOREIGN KEY (person_id) REFERENCES persons(id)
+        )
+        """)
+        print("Table 'face_encodings' created or already exists.")
+
+        # Create 'trained_images' table for per-image training results (incremental training)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trained_images (
+            image_id INT PRIMARY KEY,
+            content_hash CHAR(64) NOT NULL,
+            FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE
         )
         """)
-        print("Table 'encodings' created or already exists.")
+        print("Table 'trained_images' created or already exists.")
     except Error as err:
         print(f"Error creating tables: {err}")
     finally:
@@ -0,0 +1,90 @@
+import os
+import cv2
+import face_recognition
+import config
+
+##############################
+# Face Detectors
+##############################
+# Every backend takes an RGB image and returns boxes as (top, right, bottom, left)
+# like face_recognition.face_locations, so the boxes can go straight into
+# face_recognition.face_encodings, the tracker and the database. All of them run
+# on the CPU.
+#
+#   hog    dlib HOG + linear SVM (the original detector)
+#   cnn    dlib MMOD CNN, most accurate, far too slow for live video on a Pi
+#   haar   OpenCV Haar cascade, fastest, more false positives and misses on turned faces
+#   yunet  OpenCV YuNet DNN (cv2.FaceDetectorYN), fast and accurate; needs the ONNX model from
+#          https://github.com/opencv/opencv_zoo/tree/main/models/face_detection_yunet
+
+def _clip(box, height, width):
+    top, right, bottom, left = box
+    return (max(0, top), min(width, right), min(height, bottom), max(0, left))
+
+class DlibDetector:
+    def __init__(self, model="hog", upsample=1):
+        self.model = model
+        self.upsample = upsample
+
+    def detect(self, rgb):
+        return face_recognition.face_locations(rgb, number_of_times_to_upsample=self.upsample, model=self.model)
+
+class HaarDetector:
+    def __init__(self, cascade=None, scale_factor=1.1, min_neighbors=5, min_size=20):
+        cascade = cascade or os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self.classifier = cv2.CascadeClassifier(cascade)
+        if self.classifier.empty():
+            raise IOError(f"Could not load Haar cascade {cascade}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (min_size, min_size)
+
+    def detect(self, rgb):
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        found = self.classifier.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                                 minSize=self.min_size)
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in found]
+
+class YuNetDetector:
+    def __init__(self, model_path="models/face_detection_yunet_2023mar.onnx", score_threshold=0.8, nms_threshold=0.3, top_k=50):
+        if not os.path.exists(model_path):
+            raise IOError(f"YuNet model not found at {model_path}")
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold, nms_threshold, top_k)
+        self.input_size = None
+
+    def detect(self, rgb):
+        height, width = rgb.shape[:2]
+        if self.input_size != (width, height):
+            self.detector.setInputSize((width, height))
+            self.input_size = (width, height)
+        _, faces = self.detector.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        # Rows are x, y, w, h, 5 landmarks, score
+        return [_clip((int(y), int(x + w), int(y + h), int(x)), height, width) for x, y, w, h in faces[:, :4]]
+
+DETECTORS = {
+    "hog": lambda **params: DlibDetector("hog", **params),
+    "cnn": lambda **params: DlibDetector("cnn", **params),
+    "haar": HaarDetector,
+    "yunet": YuNetDetector,
+}
+
+def build_detector(name="hog", **params):
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector '{name}', expected one of {sorted(DETECTORS)}")
+    return DETECTORS[name](**params)
+
+# === Build a detector with the settings from config.py ===
+def detector_from_config(name=None):
+    # Falls back to HOG (with a warning) if the backend can't be loaded, e.g. a missing YuNet model
+    # or an OpenCV build without the class it needs
+    name = name or config.DETECTOR
+    try:
+        return build_detector(name, **config.DETECTOR_PARAMS.get(name, {}))
+    except (IOError, cv2.error, AttributeError) as e:
+        # AttributeError: OpenCV builds without CascadeClassifier / FaceDetectorYN
+        if name == "hog":
+            raise
+        print(f"[WARN] {e}; falling back to the HOG detector")
+        return build_detector("hog", **config.DETECTOR_PARAMS.get("hog", {}))
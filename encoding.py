@@ -0,0 +1,58 @@
+import dlib
+import numpy as np
+import face_recognition.api as face_api
+
+##############################
+# Batched face encoding
+##############################
+# face_recognition.face_encodings runs the ResNet once per face. Here faces are
+# first aligned into 150x150 chips (the same landmarks, size and padding
+# face_encodings uses, so encodings stay compatible with the existing gallery),
+# and the chips of many faces - from one multi-face photo, a chunk of training
+# images or a chunk of video frames - go through the network in one
+# compute_face_descriptor call. Results are written into one float32 matrix.
+CHIP_SIZE = 150
+CHIP_PADDING = 0.25
+
+class BatchEncoder:
+    def __init__(self, model="small", batch_size=32, num_jitters=1):
+        self.predictor = face_api.pose_predictor_5_point if model == "small" else face_api.pose_predictor_68_point
+        self.batch_size = batch_size
+        self.num_jitters = num_jitters
+
+    def chips(self, rgb, boxes):
+        # Aligned chips for the (top, right, bottom, left) boxes of one RGB image
+        if not boxes:
+            return []
+        shapes = dlib.full_object_detections()
+        for top, right, bottom, left in boxes:
+            shapes.append(self.predictor(rgb, dlib.rectangle(int(left), int(top), int(right), int(bottom))))
+        return list(dlib.get_face_chips(rgb, shapes, size=CHIP_SIZE, padding=CHIP_PADDING))
+
+    def encode_chips(self, chips):
+        # (N, 128) float32 matrix, one row per chip
+        out = np.empty((len(chips), 128), dtype=np.float32)
+        for start in range(0, len(chips), self.batch_size):
+            batch = chips[start:start + self.batch_size]
+            descriptors = face_api.face_encoder.compute_face_descriptor(batch, self.num_jitters)
+            out[start:start + len(batch)] = np.asarray(descriptors, dtype=np.float32)
+        return out
+
+    def encode(self, rgb, boxes):
+        return list(self.encode_chips(self.chips(rgb, boxes)))
+
+    def encode_many(self, items):
+        # items = [(rgb, boxes), ...]; returns a list of encoding lists, one per item
+        chips = []
+        counts = []
+        for rgb, boxes in items:
+            image_chips = self.chips(rgb, boxes)
+            chips.extend(image_chips)
+            counts.append(len(image_chips))
+        encodings = self.encode_chips(chips)
+        result = []
+        start = 0
+        for count in counts:
+            result.append(list(encodings[start:start + count]))
+            start += count
+        return result
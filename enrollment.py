@@ -0,0 +1,129 @@
+import queue
+import threading
+import cv2
+import numpy as np
+from blob_store import BlobStore
+from training import encode_image
+import config
+
+##############################
+# Enrollment-time deduplication
+##############################
+# A new photo of a person is checked against that person's existing samples
+# before it is stored, cheapest check first:
+#   exact        same SHA-256 as a stored image
+#   perceptual   64-bit dHash within `dhash_distance` bits of a stored image
+#                (re-compressed or resized copies, near-identical camera captures)
+#   encoding     every face in it is within `encoding_distance` of a face the
+#                person already has, so it adds nothing to the gallery
+# Accepted photos are encoded here with the training detector and saved as
+# trained, so the Train page does not encode them again. Counters of accepted
+# and skipped samples are kept per reason.
+#
+# submit() runs the whole enrollment (person lookup, checks, detection and
+# encoding) on one worker thread so Tk callbacks return immediately; jobs run
+# in order, so two quick captures of the same person are still compared.
+
+def dhash(image):
+    # Difference hash: compares neighbouring pixels of a 9x8 grayscale thumbnail
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def image_dhash(image_bytes):
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    return None if image is None else dhash(image)
+
+class EnrollmentDeduplicator:
+    def __init__(self, db_manager, dhash_distance=6, encoding_distance=0.2, check_encodings=True):
+        self.db_manager = db_manager
+        self.dhash_distance = dhash_distance
+        self.encoding_distance = encoding_distance
+        self.check_encodings = check_encodings
+        self.counters = {"added": 0, "exact": 0, "perceptual": 0, "encoding": 0}
+        self.jobs = queue.Queue()
+        self.thread = None
+
+    def check(self, person_id, image_bytes):
+        # Returns (reason, content hash, dHash, (boxes, encodings)); reason is None if the photo is new
+        content_hash = BlobStore.hash(image_bytes)
+        phash = image_dhash(image_bytes)
+        samples = self.db_manager.get_person_images(person_id)
+        for image_id, stored_hash, stored_phash in samples:
+            if stored_hash is None:
+                # Not moved into the blob store yet
+                continue
+            if stored_hash == content_hash:
+                return "exact", content_hash, phash, None
+            if stored_phash is None:
+                # Stored before perceptual hashes existed, fill it in once
+                try:
+                    stored_phash = image_dhash(self.db_manager.read_image(stored_hash))
+                except OSError:
+                    # Blob missing from the store, nothing to compare with
+                    continue
+                if stored_phash is not None:
+                    self.db_manager.set_image_phash(image_id, stored_phash)
+            if phash is not None and stored_phash is not None and hamming(phash, stored_phash) <= self.dhash_distance:
+                return "perceptual", content_hash, phash, None
+        if not self.check_encodings:
+            return None, content_hash, phash, None
+        boxes, encodings = encode_image(image_bytes)
+        known = self.db_manager.get_person_encodings(person_id)
+        if len(encodings) and len(known):
+            distances = np.linalg.norm(known[None, :, :] - np.asarray(encodings, dtype=np.float32)[:, None, :], axis=2)
+            if (distances.min(axis=1) <= self.encoding_distance).all():
+                return "encoding", content_hash, phash, None
+        return None, content_hash, phash, (boxes, encodings)
+
+    def enroll(self, person_id, filename, image_bytes, timestamp):
+        # Returns (image id or None, reason); reason is None when the photo was added
+        reason, content_hash, phash, faces = self.check(person_id, image_bytes)
+        if reason:
+            self.counters[reason] += 1
+            return None, reason
+        image_id, _, _ = self.db_manager.add_image(person_id, filename, image_bytes, timestamp, phash)
+        if faces is not None:
+            self.db_manager.save_trained_image(image_id, person_id, content_hash, *faces)
+        self.counters["added"] += 1
+        return image_id, None
+
+    def submit(self, name, occupation, age, filename, image_bytes, timestamp, done):
+        # Enrolls on the worker thread and calls done(image id or None, reason, error) from it;
+        # Tk callers should hand the result back to the Tk loop with after()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._worker, daemon=True)
+            self.thread.start()
+        self.jobs.put((name, occupation, age, filename, image_bytes, timestamp, done))
+
+    def _worker(self):
+        while True:
+            name, occupation, age, filename, image_bytes, timestamp, done = self.jobs.get()
+            try:
+                person_id = self.db_manager.add_person(name, occupation, age)
+                image_id, reason = self.enroll(person_id, filename, image_bytes, timestamp)
+            except Exception as e:
+                print(f"[Enrollment ERROR] {e}")
+                done(None, None, e)
+            else:
+                done(image_id, reason, None)
+
+    def skipped(self):
+        return sum(count for reason, count in self.counters.items() if reason != "added")
+
+    def describe(self, reason):
+        return {
+            "exact": "the same photo is already stored",
+            "perceptual": "a near-identical photo is already stored",
+            "encoding": "the face is too close to one already stored",
+        }[reason]
+
+# === Build a deduplicator with the settings from config.py ===
+def deduplicator_from_config(db_manager):
+    return EnrollmentDeduplicator(db_manager, dhash_distance=config.DEDUP_DHASH_DISTANCE,
+                                  encoding_distance=config.DEDUP_ENCODING_DISTANCE,
+                                  check_encodings=config.DEDUP_CHECK_ENCODINGS)
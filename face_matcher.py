@@ -0,0 +1,87 @@
+import numpy as np
+from collections import namedtuple
+from gallery_index import build_index
+import config
+
+MatchResult = namedtuple("MatchResult", ["index", "identity", "name", "distance", "margin"])
+
+##############################
+# Face Matcher
+##############################
+# Matches all faces in a frame against the gallery index in a single batched
+# search. The runner-up margin is the distance to the closest *other* identity
+# minus the best distance. With the exact backend it comes from the full
+# distance row; approximate backends are searched with a growing k until
+# another identity shows up, and report None if none is reachable through the
+# probed lists. It is inf only when the gallery holds a single identity.
+#
+# `names` is one name per gallery row, or one name per identity when
+# `identity_ids` (gallery row -> identity) is given, e.g. from a gallery file.
+class FaceMatcher:
+    def __init__(self, encodings, names, tolerance=0.6, backend="exact", index_params=None, candidates=16, identity_ids=None):
+        self.tolerance = tolerance
+        self.candidates = candidates
+        self.index = build_index(encodings, backend, **(index_params or {}))
+        if identity_ids is None:
+            identity_of = {}
+            identity_ids = [identity_of.setdefault(n, len(identity_of)) for n in names]
+            names = identity_of
+        self.names = list(names)
+        self.identity_ids = np.asarray(identity_ids, dtype=np.int32)
+        self.single_identity = len(np.unique(self.identity_ids)) <= 1
+
+    def __len__(self):
+        return len(self.index)
+
+    def match(self, face_encodings):
+        if len(face_encodings) == 0:
+            return []
+        if len(self) == 0:
+            return [MatchResult(-1, -1, "Unknown", float("inf"), float("inf")) for _ in face_encodings]
+
+        if hasattr(self.index, "distances"):
+            # Exact backend: one full distance matrix gives both the best match and the margin
+            full = self.index.distances(face_encodings)
+            best = np.argmin(full, axis=1)
+            rows = zip(best, full[np.arange(len(best)), best])
+        else:
+            full = None
+            indices, dists = self.index.search(face_encodings, k=1)
+            rows = zip(indices[:, 0], dists[:, 0])
+        results = []
+        for q, (index, distance) in enumerate(rows):
+            index = int(index)
+            distance = float(distance)
+            if index < 0:
+                # Nothing in the probed lists
+                results.append(MatchResult(-1, -1, "Unknown", distance, None))
+                continue
+            identity = int(self.identity_ids[index])
+            if full is not None:
+                others = full[q][self.identity_ids != identity]
+                margin = float(others.min()) - distance if others.size else float("inf")
+            else:
+                margin = self._search_margin(face_encodings[q:q + 1], identity, distance)
+            if distance <= self.tolerance:
+                results.append(MatchResult(index, identity, self.names[identity], distance, margin))
+            else:
+                results.append(MatchResult(-1, -1, "Unknown", distance, margin))
+        return results
+
+    def _search_margin(self, encoding, identity, distance):
+        k = self.candidates
+        while True:
+            row_i, row_d = (a[0] for a in self.index.search(encoding, k=k))
+            valid = row_i >= 0
+            others = row_d[valid][self.identity_ids[row_i[valid]] != identity]
+            if others.size:
+                return float(others[0]) - distance
+            if not valid.all() or k >= len(self):
+                # Everything reachable was searched without finding another identity
+                return float("inf") if self.single_identity else None
+            k = min(2 * k, len(self))
+
+# === Build a matcher with the index settings from config.py ===
+def matcher_from_config(encodings, names, identity_ids=None):
+    return FaceMatcher(encodings, names, tolerance=config.MATCH_TOLERANCE, backend=config.INDEX_BACKEND,
+                       index_params=config.INDEX_PARAMS.get(config.INDEX_BACKEND), identity_ids=identity_ids)
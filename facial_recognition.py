@@ -1,111 +1,75 @@
 import tkinter as tk
 from tkinter import Label
-from PIL import Image, ImageTk
-import face_recognition
 import cv2
-import numpy as np
-from picamera2 import Picamera2
 import time
-import pickle
-import pyttsx3
-import threading
-
-# === Load face encodings with metadata ===
-with open("encodings.pickle", "rb") as f:
-    data = pickle.loads(f.read())
-known_face_encodings = data["encodings"]
-known_face_names = data["names"]
-known_face_ages = data.get("ages", [])
-known_face_occupations = data.get("occupations", [])
-
-# === Text-to-speech engine ===
-engine = pyttsx3.init(driverName='espeak')
-engine.setProperty('rate', 150)
-
-# === Setup Camera ===
-picam2 = Picamera2()
-picam2.configure(picam2.create_preview_configuration(main={"format": 'XRGB8888', "size": (640, 480)}))
-picam2.start()
+import argparse
+from face_matcher import matcher_from_config
+from recognizer import recognizer_from_config
+from gallery_file import load_gallery
+from frame_sources import add_source_arguments, source_from_args, EndOfStream
+from render import TkRenderer
+from speech import announcer_from_config
+import config
+
+# === Load face gallery (memory-mapped) with metadata ===
+gallery = load_gallery(config.GALLERY_PATH)
+known_face_encodings, known_face_identities = gallery.select(config.GALLERY_MODE)
+matcher = matcher_from_config(known_face_encodings, gallery.names(), identity_ids=known_face_identities)
+
+# === Text-to-speech (queued, rate limited per person, cached audio) ===
+announcer = announcer_from_config()
+
+# === Setup Camera (or any other frame source, see --source) ===
+args = add_source_arguments(argparse.ArgumentParser(description="Face recognition UI")).parse_args()
+camera = source_from_args(args, size=(640, 480))
 
 # === Global state ===
 cv_scaler = 4
+recognizer = recognizer_from_config(matcher, cv_scaler)
 face_locations = []
-face_encodings = []
 face_names = []
 face_ages = []
 face_occupations = []
-last_spoken_name = None
 frame_count = 0
 start_time = time.time()
 fps = 0
 
-# === Speech Queue Setup ===
-speech_queue = []
-speech_lock = threading.Lock()
-
-def speech_worker():
-    while True:
-        if speech_queue:
-            with speech_lock:
-                message = speech_queue.pop(0)
-            engine.say(message)
-            engine.runAndWait()
-        else:
-            time.sleep(0.1)
-
-speech_thread = threading.Thread(target=speech_worker, daemon=True)
-speech_thread.start()
-
-# === Speak name and metadata if new, using queue ===
+# === Speak name and metadata (the announcer skips people announced recently) ===
 def speak_name(name, age, occupation):
-    global last_spoken_name, speech_queue
-    if name != "Unknown" and name != last_spoken_name:
-         message = f"Name: {name}, Age: {age}, Occupation: {occupation}"
-         with speech_lock:
-             speech_queue.append(message)
-         last_spoken_name = name
+    if name != "Unknown":
+        announcer.announce(name, f"Name: {name}, Age: {age}, Occupation: {occupation}")
 
 # === Process frame and run recognition ===
 def process_frame(frame):
-    global face_locations, face_encodings, face_names, face_ages, face_occupations
-    resized_frame = cv2.resize(frame, (0, 0), fx=1/cv_scaler, fy=1/cv_scaler)
-    rgb_resized = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-
-    face_locations = face_recognition.face_locations(rgb_resized)
-    face_encodings = face_recognition.face_encodings(rgb_resized, face_locations, model='large')
+    global face_locations, face_names, face_ages, face_occupations
+    faces = recognizer.process_frame(frame)
+    face_locations = [face.box for face in faces]
     face_names = []
     face_ages = []
     face_occupations = []
 
-    for face_encoding in face_encodings:
-        matches = face_recognition.compare_faces(known_face_encodings, face_encoding)
-        name = "Unknown"
+    for face in faces:
+        match = face.match
+        name = match.name
         age = "Unknown"
         occupation = "Unknown"
 
-        face_distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-        if len(face_distances) > 0:
-            best_index = np.argmin(face_distances)
-            if matches[best_index]:
-                name = known_face_names[best_index]
-                age = known_face_ages[best_index] if known_face_ages else "Unknown"
-                occupation = known_face_occupations[best_index] if known_face_occupations else "Unknown"
+        if match.index >= 0:
+            person = gallery.identities[match.identity]
+            age = person["age"] or "Unknown"
+            occupation = person["occupation"] or "Unknown"
 
         face_names.append(name)
         face_ages.append(age)
         face_occupations.append(occupation)
-        speak_name(name, age, occupation)
+        if face.announce:
+            speak_name(name, age, occupation)
 
     return frame
 
 # === Draw bounding boxes and only name on video feed ===
 def draw_results(frame):
     for (top, right, bottom, left), name in zip(face_locations, face_names):
-        top *= cv_scaler
-        right *= cv_scaler
-        bottom *= cv_scaler
-        left *= cv_scaler
-
         cv2.rectangle(frame, (left, top), (right, bottom), (244, 42, 3), 3)
         # Draw a filled rectangle above the face for the name label
         cv2.rectangle(frame, (left-3, top-30), (right+3, top), (244, 42, 3), cv2.FILLED)
@@ -139,6 +103,7 @@ video_frame.pack(side="right", padx=10, pady=10, fill="both", expand=True)
 
 video_label = Label(video_frame)
 video_label.pack(padx=10, pady=10)
+renderer = TkRenderer(video_label, (640, 480))
 
 output_label = Label(details_frame, text="", font=("Helvetica", 16), bg="black", fg="white", justify="left")
 output_label.pack(padx=10, pady=10, fill="both", expand=True)
@@ -146,17 +111,12 @@ output_label.pack(padx=10, pady=10, fill="both", expand=True)
 # === Main loop to update frames ===
 def update_frame():
     try:
-        frame = picam2.capture_array()
+        frame = camera.capture_array()
         process_frame(frame)
         draw_results(frame)
         current_fps = calculate_fps()
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(rgb)
-        img = img.resize((640, 480))
-        imgtk = ImageTk.PhotoImage(image=img)
-        video_label.imgtk = imgtk
-        video_label.configure(image=imgtk)
+        renderer.show(frame)
 
         # Format detected persons' details in a nice way
         if face_names:
@@ -166,14 +126,21 @@ def update_frame():
         else:
             detected_text = "No faces detected"
         output_label.config(text=f"{detected_text}\nFPS: {current_fps:.2f}")
+    except EndOfStream:
+        print("[INFO] end of recorded source")
+        on_close()
+        return
     except Exception as e:
         print(f"[ERROR] {e}")
 
-    window.after(10, update_frame)
+    # Poll less often while the motion gate is idle
+    delay = recognizer.gate.idle_delay() if recognizer.gate is not None else 0.0
+    window.after(max(10, int(delay * 1000)), update_frame)
 
 # === Clean shutdown ===
 def on_close():
-    picam2.stop()
+    announcer.stop()
+    camera.stop()
     window.destroy()
 
 window.protocol("WM_DELETE_WINDOW", on_close)
@@ -1,31 +1,36 @@
-import face_recognition
 import cv2
-import numpy as np
-from picamera2 import Picamera2
 import time
-import pickle
+import argparse
 from gpiozero import LED
+from face_matcher import matcher_from_config
+from recognizer import recognizer_from_config
+from gallery_file import load_gallery
+from frame_sources import add_source_arguments, source_from_args, EndOfStream
+from metrics import metrics_from_config, add_metrics_arguments
+import config
 
-# Load pre-trained face encodings
+# Load pre-trained face encodings (memory-mapped, shared between recognizer processes)
 print("[INFO] loading encodings...")
-with open("encodings.pickle", "rb") as f:
-    data = pickle.loads(f.read())
-known_face_encodings = data["encodings"]
-known_face_names = data["names"]
+gallery = load_gallery(config.GALLERY_PATH)
+known_face_encodings, known_face_identities = gallery.select(config.GALLERY_MODE)
+matcher = matcher_from_config(known_face_encodings, gallery.names(), identity_ids=known_face_identities)
 
-# Initialize the camera
-picam2 = Picamera2()
-picam2.configure(picam2.create_preview_configuration(main={"format": 'XRGB8888', "size": (1920, 1080)}))
-picam2.start()
+# Initialize the camera (or a recorded/synthetic source for testing, see --source)
+parser = add_source_arguments(argparse.ArgumentParser(description="Face recognition with GPIO output"))
+args = add_metrics_arguments(parser).parse_args()
+camera = source_from_args(args, size=(1920, 1080))
+
+# Rolling per-stage latency percentiles, logged periodically (and served on --metrics-port)
+metrics = metrics_from_config(args.metrics_port, prefix="[LATENCY]")
 
 # Initialize GPIO
 output = LED(14)
 
 # Initialize our variables
-cv_scaler = 4 # this has to be a whole number
+cv_scaler = 4 # starting detection downscale, adapted per frame when config.ADAPTIVE_SCALE is on
+recognizer = recognizer_from_config(matcher, cv_scaler)
 
 face_locations = []
-face_encodings = []
 face_names = []
 frame_count = 0
 start_time = time.time()
@@ -35,34 +40,21 @@ fps = 0
 authorized_names = ["john", "alice", "bob"]  # Replace with names you wish to authorise THIS IS CASE-SENSITIVE
 
 def process_frame(frame):
-    global face_locations, face_encodings, face_names
-    
-    # Resize the frame using cv_scaler to increase performance (less pixels processed, less time spent)
-    resized_frame = cv2.resize(frame, (0, 0), fx=(1/cv_scaler), fy=(1/cv_scaler))
+    global face_locations, face_names
     
-    # Convert the image from BGR to RGB colour space, the facial recognition library uses RGB, OpenCV uses BGR
-    rgb_resized_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-    
-    # Find all the faces and face encodings in the current frame of video
-    face_locations = face_recognition.face_locations(rgb_resized_frame)
-    face_encodings = face_recognition.face_encodings(rgb_resized_frame, face_locations, model='large')
+    # Detect (on a frame downscaled by cv_scaler), track and identify the faces;
+    # boxes come back in full-frame coordinates
+    faces = recognizer.process_frame(frame)
+    face_locations = [face.box for face in faces]
     
     face_names = []
     authorized_face_detected = False
     
-    for face_encoding in face_encodings:
-        # See if the face is a match for the known face(s)
-        matches = face_recognition.compare_faces(known_face_encodings, face_encoding)
-        name = "Unknown"
-        
-        # Use the known face with the smallest distance to the new face
-        face_distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-        best_match_index = np.argmin(face_distances)
-        if matches[best_match_index]:
-            name = known_face_names[best_match_index]
-            # Check if the detected face is in our authorized list
-            if name in authorized_names:
-                authorized_face_detected = True
+    for face in faces:
+        name = face.match.name
+        # Check if the detected face is in our authorized list
+        if name in authorized_names:
+            authorized_face_detected = True
         face_names.append(name)
     
     # Control the GPIO pin based on face detection
@@ -76,12 +68,6 @@ def process_frame(frame):
 def draw_results(frame):
     # Display the results
     for (top, right, bottom, left), name in zip(face_locations, face_names):
-        # Scale back up face locations since the frame we detected in was scaled
-        top *= cv_scaler
-        right *= cv_scaler
-        bottom *= cv_scaler
-        left *= cv_scaler
-        
         # Draw a box around the face
         cv2.rectangle(frame, (left, top), (right, bottom), (244, 42, 3), 3)
         
@@ -107,14 +93,27 @@ def calculate_fps():
     return fps
 
 while True:
+    loop_start = time.perf_counter()
+    # While the scene is static the motion gate slows the loop down to a few checks per second
+    if recognizer.gate is not None:
+        recognizer.gate.throttle()
+    
     # Capture a frame from camera
-    frame = picam2.capture_array()
+    try:
+        with metrics.time("capture"):
+            frame = camera.capture_array()
+    except EndOfStream:
+        break
     
     # Process the frame with the function
     processed_frame = process_frame(frame)
+    metrics.observe_all(recognizer.timings)
+    if recognizer.gate is not None:
+        metrics.set_gauge("idle", int(recognizer.gate.idle))
     
     # Get the text and boxes to be drawn based on the processed frame
-    display_frame = draw_results(processed_frame)
+    with metrics.time("draw"):
+        display_frame = draw_results(processed_frame)
     
     # Calculate and update FPS
     current_fps = calculate_fps()
@@ -124,13 +123,18 @@ while True:
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
     
     # Display everything over the video feed.
-    cv2.imshow('Video', display_frame)
+    with metrics.time("display"):
+        cv2.imshow('Video', display_frame)
+        key = cv2.waitKey(1)
+    metrics.observe("frame", (time.perf_counter() - loop_start) * 1000.0)
+    metrics.maybe_log()
     
     # Break the loop and stop the script if 'q' is pressed
-    if cv2.waitKey(1) == ord("q"):
+    if key == ord("q"):
         break
 
 # By breaking the loop we run this code here which closes everything
 cv2.destroyAllWindows()
-picam2.stop()
+camera.stop()
+metrics.close()
 output.off()  # Make sure to turn off the GPIO pin when exiting
\ No newline at end of file
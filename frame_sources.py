@@ -0,0 +1,169 @@
+import os
+import time
+import cv2
+import numpy as np
+from imutils import paths
+import config
+
+##############################
+# Frame Sources
+##############################
+# Every source exposes the small part of the Picamera2 API the recognizers use:
+# start(), capture_array() and stop(). Frames are BGR(X) numpy arrays.
+#
+# Source specs (config.FRAME_SOURCE or --source):
+#   picamera             the Raspberry Pi camera
+#   camera:<index>       an OpenCV VideoCapture device, e.g. camera:0
+#   video:<path>         a recorded video file
+#   images:<directory>   replay a folder of images (e.g. dataset/)
+#   synthetic[:<frames>] generated frames, no hardware or files needed
+# A bare path is treated as images:/video: depending on whether it is a folder.
+
+class EndOfStream(Exception):
+    pass
+
+class FrameSource:
+    def __init__(self, fps=None, loop=True):
+        self.fps = fps
+        self.loop = loop
+        self.frame_index = 0
+        self._next_time = None
+
+    def start(self):
+        self._next_time = time.perf_counter()
+
+    def stop(self):
+        pass
+
+    def read(self):
+        raise NotImplementedError
+
+    def capture_array(self):
+        # Throttle to `fps` when replaying recorded footage at real-time speed
+        if self.fps:
+            if self._next_time is None:
+                self._next_time = time.perf_counter()
+            delay = self._next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_time = max(self._next_time, time.perf_counter() - 1.0) + 1.0 / self.fps
+        frame = self.read()
+        self.frame_index += 1
+        return frame
+
+class PicameraSource(FrameSource):
+    def __init__(self, size=(640, 480), fps=None, loop=True):
+        super().__init__(fps, loop)
+        from picamera2 import Picamera2
+        self.camera = Picamera2()
+        self.camera.configure(self.camera.create_preview_configuration(main={"format": 'XRGB8888', "size": size}))
+
+    def start(self):
+        super().start()
+        self.camera.start()
+
+    def stop(self):
+        self.camera.stop()
+
+    def read(self):
+        return self.camera.capture_array()
+
+class VideoCaptureSource(FrameSource):
+    def __init__(self, target, size=None, fps=None, loop=True):
+        super().__init__(fps, loop)
+        self.target = target
+        self.size = size
+        self.capture = cv2.VideoCapture(target)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video source {target}")
+        if size and isinstance(target, int):
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+
+    def stop(self):
+        self.capture.release()
+
+    def read(self):
+        ok, frame = self.capture.read()
+        if not ok and self.loop and not isinstance(self.target, int):
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        if not ok:
+            raise EndOfStream(f"No more frames in {self.target}")
+        return frame
+
+class ImageDirectorySource(FrameSource):
+    def __init__(self, directory, size=None, fps=None, loop=True):
+        super().__init__(fps, loop)
+        self.size = size
+        self.image_paths = sorted(paths.list_images(directory))
+        if not self.image_paths:
+            raise IOError(f"No images found in {directory}")
+        self.position = 0
+        self.current_path = None
+
+    def read(self):
+        if self.position >= len(self.image_paths):
+            if not self.loop:
+                raise EndOfStream("No more images")
+            self.position = 0
+        self.current_path = self.image_paths[self.position]
+        self.position += 1
+        frame = cv2.imread(self.current_path)
+        if self.size and frame.shape[1::-1] != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size))
+        return frame
+
+class SyntheticSource(FrameSource):
+    # A textured square drifting over a noisy background; deterministic for a given seed
+    def __init__(self, size=(640, 480), fps=None, loop=True, seed=0, frames=None):
+        super().__init__(fps, loop)
+        self.size = size
+        self.frames = frames
+        rng = np.random.default_rng(seed)
+        width, height = size
+        self.background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+        self.patch = rng.integers(0, 255, (height // 4, height // 4, 3), dtype=np.uint8)
+
+    def read(self):
+        if self.frames is not None and self.frame_index >= self.frames and not self.loop:
+            raise EndOfStream("Synthetic stream finished")
+        width, height = self.size
+        frame = self.background.copy()
+        side = self.patch.shape[0]
+        x = int((np.sin(self.frame_index / 30.0) + 1) / 2 * (width - side))
+        y = int((np.cos(self.frame_index / 45.0) + 1) / 2 * (height - side))
+        frame[y:y + side, x:x + side] = self.patch
+        return frame
+
+def open_source(spec="picamera", size=(640, 480), fps=None, loop=True):
+    kind, _, target = spec.partition(":")
+    if kind == "picamera":
+        return PicameraSource(size, fps, loop)
+    if kind == "camera":
+        return VideoCaptureSource(int(target or 0), size, fps, loop)
+    if kind == "video":
+        return VideoCaptureSource(target, size, fps, loop)
+    if kind == "images":
+        return ImageDirectorySource(target, size, fps, loop)
+    if kind == "synthetic":
+        return SyntheticSource(size, fps, loop, frames=int(target) if target else None)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, size, fps, loop)
+    if os.path.isfile(spec):
+        return VideoCaptureSource(spec, size, fps, loop)
+    raise ValueError(f"Unknown frame source '{spec}'")
+
+# === Command line helpers shared by the recognizers ===
+def add_source_arguments(parser):
+    parser.add_argument("--source", default=config.FRAME_SOURCE,
+                        help="picamera, camera:<index>, video:<path>, images:<dir> or synthetic")
+    parser.add_argument("--fps", type=float, default=config.SOURCE_FPS,
+                        help="Replay rate for recorded sources (default: as fast as possible)")
+    parser.add_argument("--no-loop", action="store_true", help="Stop at the end of a recorded source instead of rewinding")
+    return parser
+
+def source_from_args(args, size=(640, 480)):
+    source = open_source(args.source, size=size, fps=args.fps, loop=not args.no_loop)
+    source.start()
+    return source
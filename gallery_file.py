@@ -0,0 +1,110 @@
+import os
+import json
+import pickle
+import struct
+import numpy as np
+
+##############################
+# Binary Gallery File
+##############################
+# Layout (little endian, version 1):
+#   header   64 bytes: magic, version, count, dim, identity count, prototype count,
+#                      encodings offset, identity index offset, prototype offset,
+#                      string table offset, string table length
+#   encodings     float32 (count, dim)    -> np.memmap, shared through the page cache
+#   identity idx  int32 (count,)          -> row -> identity
+#   prototypes    int32 (prototype count) -> rows used in "prototype" gallery mode
+#   string table  UTF-8 JSON list of {"name", "age", "occupation"} per identity
+
+MAGIC = b"FGAL"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIII5Q")
+ALIGN = 64
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+def save_gallery(path, encodings, names, ages=None, occupations=None, prototype_indices=None):
+    matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, 128))
+    count = matrix.shape[0]
+    ages = ages or [None] * count
+    occupations = occupations or [None] * count
+
+    identity_of = {}
+    identities = []
+    identity_index = np.empty(count, dtype=np.int32)
+    for row, key in enumerate(zip(names, ages, occupations)):
+        if key not in identity_of:
+            identity_of[key] = len(identities)
+            identities.append({"name": key[0], "age": key[1], "occupation": key[2]})
+        identity_index[row] = identity_of[key]
+    prototypes = np.asarray(prototype_indices if prototype_indices is not None else [], dtype=np.int32)
+    strings = json.dumps(identities).encode("utf-8")
+
+    enc_offset = _aligned(HEADER.size)
+    ids_offset = _aligned(enc_offset + matrix.nbytes)
+    proto_offset = _aligned(ids_offset + identity_index.nbytes)
+    str_offset = _aligned(proto_offset + prototypes.nbytes)
+    header = HEADER.pack(MAGIC, VERSION, count, 128, len(identities), len(prototypes),
+                         enc_offset, ids_offset, proto_offset, str_offset, len(strings))
+
+    # Write to a temp file and rename so running recognizers never see a half-written gallery
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for offset, blob in ((0, header), (enc_offset, matrix.tobytes()), (ids_offset, identity_index.tobytes()),
+                             (proto_offset, prototypes.tobytes()), (str_offset, strings)):
+            f.seek(offset)
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+class Gallery:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            raw = f.read(HEADER.size)
+            if len(raw) < HEADER.size:
+                raise ValueError(f"{path} is not a gallery file")
+            (magic, version, count, dim, n_identities, n_prototypes,
+             enc_offset, ids_offset, proto_offset, str_offset, str_len) = HEADER.unpack(raw)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a gallery file")
+            if version != VERSION:
+                raise ValueError(f"Unsupported gallery version {version} in {path}")
+            f.seek(str_offset)
+            self.identities = json.loads(f.read(str_len).decode("utf-8"))
+
+        if count:
+            self.encodings = np.memmap(path, dtype=np.float32, mode="r", offset=enc_offset, shape=(count, dim))
+            self.identity_index = np.memmap(path, dtype=np.int32, mode="r", offset=ids_offset, shape=(count,))
+        else:
+            self.encodings = np.empty((0, dim), dtype=np.float32)
+            self.identity_index = np.empty(0, dtype=np.int32)
+        if n_prototypes:
+            self.prototype_indices = np.memmap(path, dtype=np.int32, mode="r", offset=proto_offset, shape=(n_prototypes,))
+        else:
+            self.prototype_indices = None
+
+    def __len__(self):
+        return self.encodings.shape[0]
+
+    def select(self, mode="full"):
+        # Returns (encodings, identity_index) for the requested gallery mode
+        if mode == "prototype" and self.prototype_indices is not None:
+            rows = np.asarray(self.prototype_indices)
+            return self.encodings[rows], self.identity_index[rows]
+        return self.encodings, self.identity_index
+
+    def names(self):
+        return [identity["name"] for identity in self.identities]
+
+def convert_pickle(pickle_path, path):
+    with open(pickle_path, "rb") as f:
+        data = pickle.loads(f.read())
+    save_gallery(path, data["encodings"], data["names"], data.get("ages"), data.get("occupations"),
+                 data.get("prototype_indices"))
+
+def load_gallery(path, pickle_path="encodings.pickle"):
+    # One-off migration for setups that only have the old pickle
+    if not os.path.exists(path) and os.path.exists(pickle_path):
+        print(f"[INFO] converting {pickle_path} to {path}...")
+        convert_pickle(pickle_path, path)
+    return Gallery(path)
@@ -0,0 +1,145 @@
+import numpy as np
+
+##############################
+# Gallery Index
+##############################
+# All backends share the same API:
+#   index = build_index(encodings, backend="exact" | "ivf", **params)
+#   indices, distances = index.search(queries, k)
+# indices/distances are (Q, k) arrays sorted by distance; missing slots are -1 / inf.
+
+def _sq_norms(matrix):
+    return np.einsum("ij,ij->i", matrix, matrix)
+
+def _pairwise_distances(queries, matrix, matrix_sq_norms):
+    sq = _sq_norms(queries)[:, None] + matrix_sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+    np.maximum(sq, 0.0, out=sq)
+    return np.sqrt(sq, out=sq)
+
+def _top_k(dists, k):
+    k = min(k, dists.shape[1])
+    if k < dists.shape[1]:
+        part = np.argpartition(dists, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(dists.shape[1]), (dists.shape[0], 1))
+    part_d = np.take_along_axis(dists, part, axis=1)
+    order = np.argsort(part_d, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_d, order, axis=1)
+
+def _pad(indices, distances, k):
+    if indices.shape[1] == k:
+        return indices, distances
+    q = indices.shape[0]
+    out_i = np.full((q, k), -1, dtype=np.int64)
+    out_d = np.full((q, k), np.inf, dtype=np.float32)
+    out_i[:, :indices.shape[1]] = indices
+    out_d[:, :distances.shape[1]] = distances
+    return out_i, out_d
+
+def _as_matrix(encodings):
+    return np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, 128))
+
+# === Exact brute-force backend ===
+class ExactIndex:
+    def __init__(self, encodings):
+        self.matrix = _as_matrix(encodings)
+        self.sq_norms = _sq_norms(self.matrix)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def search(self, queries, k=1):
+        queries = _as_matrix(queries)
+        if len(self) == 0:
+            return _pad(np.empty((len(queries), 0), np.int64), np.empty((len(queries), 0), np.float32), k)
+        dists = _pairwise_distances(queries, self.matrix, self.sq_norms)
+        return _pad(*_top_k(dists, k), k)
+
+    def distances(self, queries):
+        # Full (Q, N) distance matrix, for callers that need every row (e.g. runner-up margins)
+        return _pairwise_distances(_as_matrix(queries), self.matrix, self.sq_norms)
+
+# === IVF backend: k-means coarse clustering + probing the nearest lists ===
+class IVFIndex:
+    def __init__(self, encodings, nlist=None, nprobe=8, n_iter=10, seed=0):
+        matrix = _as_matrix(encodings)
+        n = matrix.shape[0]
+        self.nlist = max(1, min(n, nlist or int(np.sqrt(n)))) if n else 0
+        self.nprobe = nprobe
+        if n == 0:
+            self.centroids = np.empty((0, 128), np.float32)
+            self.matrix = matrix
+            self.ids = np.empty(0, np.int64)
+            self.offsets = np.zeros(1, np.int64)
+            self.sq_norms = np.empty(0, np.float32)
+            self.centroid_sq_norms = np.empty(0, np.float32)
+            return
+        self.centroids = self._kmeans(matrix, self.nlist, n_iter, np.random.default_rng(seed))
+        self.centroid_sq_norms = _sq_norms(self.centroids)
+        assign = self._assign(matrix)
+        # Store rows grouped by list so every probe is a contiguous slice
+        order = np.argsort(assign, kind="stable")
+        self.ids = order.astype(np.int64)
+        self.matrix = np.ascontiguousarray(matrix[order])
+        self.sq_norms = _sq_norms(self.matrix)
+        counts = np.bincount(assign, minlength=self.nlist)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _assign(self, matrix, chunk=8192):
+        assign = np.empty(matrix.shape[0], dtype=np.int64)
+        for start in range(0, matrix.shape[0], chunk):
+            block = matrix[start:start + chunk]
+            assign[start:start + chunk] = np.argmin(_pairwise_distances(block, self.centroids, self.centroid_sq_norms), axis=1)
+        return assign
+
+    def _kmeans(self, matrix, nlist, n_iter, rng):
+        # Train on a sample; 256 points per list is plenty for coarse clustering
+        sample = matrix
+        if matrix.shape[0] > nlist * 256:
+            sample = matrix[rng.choice(matrix.shape[0], nlist * 256, replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            self.centroids = centroids
+            self.centroid_sq_norms = _sq_norms(centroids)
+            assign = self._assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty lists from random sample points
+            if not filled.all():
+                centroids[~filled] = sample[rng.choice(sample.shape[0], int((~filled).sum()), replace=False)]
+        return centroids
+
+    def search(self, queries, k=1):
+        queries = _as_matrix(queries)
+        if len(self) == 0:
+            return _pad(np.empty((len(queries), 0), np.int64), np.empty((len(queries), 0), np.float32), k)
+        nprobe = min(self.nprobe, self.nlist)
+        coarse = _pairwise_distances(queries, self.centroids, self.centroid_sq_norms)
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < self.nlist else np.tile(np.arange(self.nlist), (len(queries), 1))
+        out_i = np.full((len(queries), k), -1, dtype=np.int64)
+        out_d = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for row, lists in enumerate(probes):
+            rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            if rows.size == 0:
+                continue
+            dists = _pairwise_distances(queries[row:row + 1], self.matrix[rows], self.sq_norms[rows])
+            idx, d = _top_k(dists, k)
+            out_i[row, :idx.shape[1]] = self.ids[rows[idx[0]]]
+            out_d[row, :d.shape[1]] = d[0]
+        return out_i, out_d
+
+BACKENDS = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
+
+def build_index(encodings, backend="exact", **params):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown gallery index backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](encodings, **params)
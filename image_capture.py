@@ -5,8 +5,9 @@ import cv2
 import os
 import json
 from datetime import datetime
-from picamera2 import Picamera2
 import time
+import argparse
+from frame_sources import add_source_arguments, source_from_args
 
 # === Setup folders ===
 def create_folder(name):
@@ -45,9 +46,8 @@ def save_metadata(name, filename, occupation, age):
     print(f"Metadata saved for {filename}")
 
 # === Camera Setup ===
-picam2 = Picamera2()
-picam2.configure(picam2.create_preview_configuration(main={"format": 'XRGB8888', "size": (640, 480)}))
-picam2.start()
+args = add_source_arguments(argparse.ArgumentParser(description="Face dataset collector")).parse_args()
+camera = source_from_args(args, size=(640, 480))
 time.sleep(2)
 
 # === Tkinter Setup ===
@@ -91,7 +91,7 @@ def capture_photo():
         return
 
     folder = create_folder(name)
-    frame = picam2.capture_array()
+    frame = camera.capture_array()
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{name}_{timestamp}.jpg"
@@ -106,7 +106,7 @@ capture_btn.pack(pady=20)
 
 # Update live camera feed
 def update_frame():
-    frame = picam2.capture_array()
+    frame = camera.capture_array()
     rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     img = Image.fromarray(rgb)
     img = img.resize((640, 480))
@@ -116,7 +116,7 @@ def update_frame():
     window.after(10, update_frame)
 
 def on_close():
-    picam2.stop()
+    camera.stop()
     window.destroy()
 
 window.protocol("WM_DELETE_WINDOW", on_close)
@@ -6,18 +6,30 @@ import os
 import json
 import time
 import threading
+import queue
+import argparse
 from datetime import datetime
-from picamera2 import Picamera2
-import face_recognition
-import pickle
+from collections import deque
 import numpy as np
-import pyttsx3
 from imutils import paths
 import mysql.connector
+from contextlib import contextmanager
+from face_matcher import matcher_from_config
+from recognizer import recognizer_from_config
+from pipeline import RecognitionPipeline
+from frame_sources import open_source, add_source_arguments
+from metrics import LatencyMetrics, metrics_from_config, add_metrics_arguments
+from render import TkRenderer
+from speech import announcer_from_config
+from prototypes import build_prototypes
+from gallery_file import save_gallery
+from training import encode_images
+from blob_store import blob_store_from_config
+from enrollment import deduplicator_from_config
+import config
 
 # Additional imports for scraper functionality
 import requests
-from pathlib import Path
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -26,116 +38,359 @@ from selenium.webdriver.chrome.service import Service as ChromeService
 from shutil import which
 import io
 
-##############################
-# Utility Function
-##############################
-def save_image_for_model(name, image_bytes):
-    dataset_dir = Path("dataset") / name
-    dataset_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = dataset_dir / f"{timestamp}.jpg"
-    with open(filename, "wb") as f:
-        f.write(image_bytes)
-    print(f"[SAVE] Image saved to {filename}")
-
 ##############################
 # Database Manager
 ##############################
+# Every operation borrows a connection from a pool and opens its own cursor, so
+# the Tk thread, the training thread and the scraper thread can use the
+# database at the same time. The pool opens up to `pool_size` connections on
+# demand and keeps track of them so close() can shut them all down. Connections
+# are pinged (and reconnected if MySQL dropped them) when they are taken.
+# Image bytes are kept in the content-addressed BlobStore (blob_store.py); the
+# images table only holds their SHA-256 next to the metadata.
 class DatabaseManager:
-    def __init__(self, host='localhost', user='root', password='Right1234', database='face_recognition_db'):
+    def __init__(self, host='localhost', user='root', password='Right1234', database='face_recognition_db',
+                 pool_size=config.DB_POOL_SIZE, blobs=None):
+        self.blobs = blobs or blob_store_from_config()
+        connect_args = dict(host=host, user=user, password=password, unix_socket='/var/run/mysqld/mysqld.sock')
+        self.database = database
+        self.connect_args = dict(connect_args, database=database, autocommit=True)
+        self.pool_size = pool_size
+        self.idle = queue.LifoQueue()
+        self.connections = []
+        self.pool_lock = threading.Lock()
         try:
-            self.cnx = mysql.connector.connect(
-                host=host,
-                user=user,
-                password=password,
-                unix_socket='/var/run/mysqld/mysqld.sock'
-            )
-            self.cnx.autocommit = True
-            self.cursor = self.cnx.cursor()
+            # The database may not exist yet, so create it before the pool connects to it
+            cnx = mysql.connector.connect(**connect_args)
+            self.create_database(cnx)
+            cnx.close()
+            self.release(self.connection())
         except Exception as e:
             raise Exception(f"Failed to connect to MySQL: {e}")
-        self.database = database
-        self.create_database()
-        self.cnx.database = database
         self.create_tables()
-    
-    def create_database(self):
-        self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+        self.migrate_images()
+        # Moving old LONGBLOBs into the blob store can take long on a big database, so it
+        # runs in the background; training waits for it (see TrainFrame.train_model)
+        self.migration_progress = (0, 0)
+        self.migration = threading.Thread(target=self.move_blobs, daemon=True)
+        self.migration.start()
+
+    def connection(self, timeout=10.0):
+        # An idle connection, a new one while fewer than pool_size are open, or else
+        # the next one released within `timeout` seconds
+        try:
+            cnx = self.idle.get_nowait()
+        except queue.Empty:
+            with self.pool_lock:
+                opened = len(self.connections) < self.pool_size
+                if opened:
+                    cnx = mysql.connector.connect(**self.connect_args)
+                    self.connections.append(cnx)
+            if not opened:
+                try:
+                    cnx = self.idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise Exception(f"No free database connection after {timeout:.0f}s")
+        try:
+            cnx.ping(reconnect=True, attempts=3, delay=1)
+        except Exception:
+            # Unreachable even after reconnecting: forget it so its slot can be reopened
+            with self.pool_lock:
+                if cnx in self.connections:
+                    self.connections.remove(cnx)
+            raise
+        return cnx
+
+    def release(self, cnx):
+        self.idle.put(cnx)
+
+    @contextmanager
+    def cursor(self, transaction=False):
+        # One connection + cursor per operation; the connection goes back to the pool afterwards
+        # The connection is returned to the pool whatever fails, or its slot would be lost for good
+        cnx = self.connection()
+        cursor = None
+        started = False
+        try:
+            cursor = cnx.cursor()
+            if transaction:
+                cnx.start_transaction()
+                started = True
+            yield cursor
+            if started:
+                cnx.commit()
+        except Exception:
+            if started:
+                cnx.rollback()
+            raise
+        finally:
+            try:
+                if cursor is not None:
+                    cursor.close()
+            finally:
+                self.release(cnx)
+
+    def create_database(self, cnx):
+        cursor = cnx.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+        cursor.close()
     
     def create_tables(self):
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS persons (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            occupation VARCHAR(255),
-            age INT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS images (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            person_id INT,
-            filename VARCHAR(255),
-            image LONGBLOB,
-            timestamp DATETIME,
-            FOREIGN KEY (person_id) REFERENCES persons(id)
-        )
-        """)
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS encodings (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            data LONGBLOB,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        )
-        """)
+        with self.cursor() as cursor:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS persons (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                occupation VARCHAR(255),
+                age INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            # `image` is only filled in databases from before the blob store, see migrate_images
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                person_id INT,
+                filename VARCHAR(255),
+                image LONGBLOB,
+                content_hash CHAR(64),
+                phash BIGINT UNSIGNED,
+                timestamp DATETIME,
+                INDEX (content_hash),
+                FOREIGN KEY (person_id) REFERENCES persons(id)
+            )
+            """)
+            # One row per detected face: packed float32 encoding + bounding box
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS face_encodings (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                image_id INT NOT NULL,
+                person_id INT NOT NULL,
+                encoding VARBINARY(512) NOT NULL,
+                box_top INT,
+                box_right INT,
+                box_bottom INT,
+                box_left INT,
+                is_prototype TINYINT(1) NOT NULL DEFAULT 0,
+                INDEX (image_id),
+                FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE,
+                FOREIGN KEY (person_id) REFERENCES persons(id)
+            )
+            """)
+            # Which images have been trained, keyed by image id + SHA-256 of the image bytes
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS trained_images (
+                image_id INT PRIMARY KEY,
+                content_hash CHAR(64) NOT NULL,
+                FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE
+            )
+            """)
     
     def add_person(self, name, occupation, age):
-        query = "SELECT id FROM persons WHERE name = %s"
-        self.cursor.execute(query, (name,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        else:
-            query = "INSERT INTO persons (name, occupation, age) VALUES (%s, %s, %s)"
-            self.cursor.execute(query, (name, occupation, age))
-            return self.cursor.lastrowid
+        with self.cursor() as cursor:
+            query = "SELECT id FROM persons WHERE name = %s"
+            cursor.execute(query, (name,))
+            result = cursor.fetchone()
+            if result:
+                return result[0]
+            else:
+                query = "INSERT INTO persons (name, occupation, age) VALUES (%s, %s, %s)"
+                cursor.execute(query, (name, occupation, age))
+                return cursor.lastrowid
     
-    def add_image(self, person_id, filename, image_data, timestamp):
-        query = "INSERT INTO images (person_id, filename, image, timestamp) VALUES (%s, %s, %s, %s)"
-        self.cursor.execute(query, (person_id, filename, image_data, timestamp))
+    def add_column(self, table, column, definition):
+        # ALTER TABLE ... ADD COLUMN for tables created by an older version of the app
+        with self.cursor() as cursor:
+            cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s
+            """, (self.database, table, column))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def migrate_images(self):
+        # Databases created before the blob store have no content_hash/phash columns yet
+        self.add_column("images", "content_hash", "CHAR(64) AFTER image, ADD INDEX (content_hash)")
+        self.add_column("images", "phash", "BIGINT UNSIGNED AFTER content_hash")
+
+    def move_blobs(self):
+        # Moves bytes still kept in images.image into the blob store. BlobStore.put has
+        # fsynced the file before the LONGBLOB is cleared, so a power cut at any point
+        # leaves at least one durable copy; an interrupted run resumes on the next start.
+        try:
+            with self.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM images WHERE image IS NOT NULL")
+                total = cursor.fetchone()[0]
+            if not total:
+                return
+            print(f"[INFO] Moving {total} images from MySQL into the blob store at {self.blobs.root}...")
+            moved = 0
+            query = "SELECT id, image FROM images WHERE image IS NOT NULL AND id > %s ORDER BY id LIMIT %s"
+            for image_id, image in self._pages(query):
+                content_hash = self.blobs.put(image)
+                with self.cursor() as cursor:
+                    cursor.execute("UPDATE images SET content_hash = %s, image = NULL WHERE id = %s", (content_hash, image_id))
+                moved += 1
+                self.migration_progress = (moved, total)
+                if moved % 100 == 0:
+                    print(f"[INFO] Moved {moved}/{total} images into the blob store")
+            print(f"[INFO] Moved {moved} images from MySQL into the blob store")
+        except Exception as e:
+            print(f"[ERROR] Moving images into the blob store: {e}")
+
+    def add_image(self, person_id, filename, image_data, timestamp, phash=None):
+        # Returns (image id, content hash, True if the row is new). The same photo of
+        # the same person is stored once and keeps its existing row (and encodings).
+        # `phash` is the perceptual hash used by enrollment.EnrollmentDeduplicator.
+        content_hash = self.blobs.put(image_data)
+        with self.cursor() as cursor:
+            cursor.execute("SELECT id FROM images WHERE person_id = %s AND content_hash = %s LIMIT 1", (person_id, content_hash))
+            result = cursor.fetchone()
+            if result:
+                return result[0], content_hash, False
+            query = "INSERT INTO images (person_id, filename, content_hash, phash, timestamp) VALUES (%s, %s, %s, %s, %s)"
+            cursor.execute(query, (person_id, filename, content_hash, phash, timestamp))
+            return cursor.lastrowid, content_hash, True
+
+    def read_image(self, content_hash):
+        return self.blobs.get(content_hash)
+
+    def get_person_images(self, person_id):
+        # [(image id, content hash, perceptual hash or None), ...] of one person
+        query = "SELECT id, content_hash, phash FROM images WHERE person_id = %s ORDER BY id"
+        with self.cursor() as cursor:
+            cursor.execute(query, (person_id,))
+            return cursor.fetchall()
+
+    def set_image_phash(self, image_id, phash):
+        with self.cursor() as cursor:
+            cursor.execute("UPDATE images SET phash = %s WHERE id = %s", (phash, image_id))
+
+    def get_person_encodings(self, person_id):
+        # float32 (N, 128) matrix of every face stored for one person
+        query = "SELECT encoding FROM face_encodings WHERE person_id = %s ORDER BY id"
+        with self.cursor() as cursor:
+            cursor.execute(query, (person_id,))
+            chunks = [row[0] for row in cursor.fetchall()]
+        return np.frombuffer(b"".join(chunks), dtype=np.float32).reshape(-1, 128)
     
-    def get_all_images(self):
+    # === Streaming reads ===
+    # Image rows are read in pages of `batch_size` rows using keyset pagination on
+    # the id (WHERE id > last id ORDER BY id LIMIT n), so only one page is in memory
+    # at a time and no connection is held while the caller works on the rows.
+    def _pages(self, query, params=(), batch_size=None):
+        batch_size = batch_size or config.DB_FETCH_BATCH
+        last_id = 0
+        while True:
+            with self.cursor() as cursor:
+                cursor.execute(query, (*params, last_id, batch_size))
+                rows = cursor.fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    # Images that were never trained or whose bytes changed since (rows still waiting
+    # for move_blobs have no content hash yet and are left for the next run)
+    PENDING_IMAGES = "i.content_hash IS NOT NULL AND (t.content_hash IS NULL OR t.content_hash <> i.content_hash)"
+
+    def iter_images(self, pending_only=False, batch_size=None):
+        # Yields (image id, person id, content hash) in id order; the bytes are read from self.blobs
         query = """
-        SELECT p.name, p.occupation, p.age, i.image
+        SELECT i.id, i.person_id, i.content_hash
         FROM images i
-        JOIN persons p ON i.person_id = p.id
+        LEFT JOIN trained_images t ON t.image_id = i.id
+        WHERE i.id > %s
         """
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
-    
-    def update_encodings(self, data):
-        query = "SELECT id FROM encodings LIMIT 1"
-        self.cursor.execute(query)
-        result = self.cursor.fetchone()
-        if result:
-            query = "UPDATE encodings SET data = %s WHERE id = %s"
-            self.cursor.execute(query, (data, result[0]))
-        else:
-            query = "INSERT INTO encodings (data) VALUES (%s)"
-            self.cursor.execute(query, (data,))
-    
-    def get_encodings(self):
-        query = "SELECT data FROM encodings ORDER BY updated_at DESC LIMIT 1"
-        self.cursor.execute(query)
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        return None
+        if pending_only:
+            query += f" AND {self.PENDING_IMAGES}"
+        return self._pages(query + " ORDER BY i.id LIMIT %s", batch_size=batch_size)
+
+    def count_images(self, pending_only=False):
+        query = "SELECT COUNT(*) FROM images i LEFT JOIN trained_images t ON t.image_id = i.id"
+        if pending_only:
+            query += f" WHERE {self.PENDING_IMAGES}"
+        with self.cursor() as cursor:
+            cursor.execute(query)
+            return cursor.fetchone()[0]
+
+    def get_stale_trained_images(self):
+        # Trained ids whose image row no longer exists
+        query = """
+        SELECT t.image_id FROM trained_images t
+        LEFT JOIN images i ON i.id = t.image_id
+        WHERE i.id IS NULL
+        """
+        with self.cursor() as cursor:
+            cursor.execute(query)
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_persons(self):
+        query = "SELECT id, name, occupation, age FROM persons"
+        with self.cursor() as cursor:
+            cursor.execute(query)
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def save_trained_image(self, image_id, person_id, content_hash, boxes, encodings):
+        # Replace whatever faces this image had before with the fresh results, atomically
+        with self.cursor(transaction=True) as cursor:
+            cursor.execute("DELETE FROM face_encodings WHERE image_id = %s", (image_id,))
+            if encodings:
+                query = """
+                INSERT INTO face_encodings (image_id, person_id, encoding, box_top, box_right, box_bottom, box_left)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """
+                rows = [(image_id, person_id, np.asarray(encoding, dtype=np.float32).tobytes(), *map(int, box))
+                        for box, encoding in zip(boxes, encodings)]
+                cursor.executemany(query, rows)
+            query = "REPLACE INTO trained_images (image_id, content_hash) VALUES (%s, %s)"
+            cursor.execute(query, (image_id, content_hash))
+
+    def delete_trained_images(self, image_ids):
+        if not image_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(image_ids))
+        with self.cursor(transaction=True) as cursor:
+            cursor.execute(f"DELETE FROM face_encodings WHERE image_id IN ({placeholders})", tuple(image_ids))
+            cursor.execute(f"DELETE FROM trained_images WHERE image_id IN ({placeholders})", tuple(image_ids))
+
+    def get_gallery(self, prototypes_only=False):
+        # Streams every encoding row and returns (face_ids, person_ids, float32 (N, 128) matrix).
+        # The matrix is a zero-copy view over the concatenated packed vectors.
+        query = "SELECT id, person_id, encoding FROM face_encodings"
+        if prototypes_only:
+            query += " WHERE is_prototype = 1"
+        face_ids = []
+        person_ids = []
+        chunks = []
+        with self.cursor() as cursor:
+            cursor.execute(query + " ORDER BY id")
+            for face_id, person_id, encoding in cursor:
+                face_ids.append(face_id)
+                person_ids.append(person_id)
+                chunks.append(encoding)
+        matrix = np.frombuffer(b"".join(chunks), dtype=np.float32).reshape(-1, 128)
+        return np.array(face_ids, dtype=np.int64), np.array(person_ids, dtype=np.int32), matrix
+
+    def set_prototypes(self, face_ids):
+        face_ids = [int(face_id) for face_id in face_ids]
+        with self.cursor(transaction=True) as cursor:
+            cursor.execute("UPDATE face_encodings SET is_prototype = 0 WHERE is_prototype = 1")
+            for start in range(0, len(face_ids), 1000):
+                chunk = face_ids[start:start + 1000]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"UPDATE face_encodings SET is_prototype = 1 WHERE id IN ({placeholders})", tuple(chunk))
 
     def close(self):
-        self.cursor.close()
-        self.cnx.close()
+        # Closes every connection the pool opened, including any still lent out
+        with self.pool_lock:
+            connections, self.connections = self.connections, []
+        for cnx in connections:
+            try:
+                cnx.close()
+            except Exception as e:
+                print(f"[WARN] Closing database connection: {e}")
+        self.idle = queue.LifoQueue()
 
 ##############################
 # Scraper – Profile Entry UI
@@ -174,9 +429,10 @@ class ProfileEntryUI(tk.Frame):
 # Scraper – Profile Reviewer UI
 ##############################
 class ProfileReviewer(tk.Frame):
-    def __init__(self, master, name, occupation, age, image_bytes, db_manager, log_callback=None):
+    def __init__(self, master, name, occupation, age, image_bytes, db_manager, deduplicator, log_callback=None):
         super().__init__(master, bg="#333333", bd=2, relief=tk.RIDGE)
         self.db_manager = db_manager
+        self.deduplicator = deduplicator
         self.log_callback = log_callback
 
         # Name field
@@ -198,6 +454,7 @@ class ProfileReviewer(tk.Frame):
         self.age_entry.grid(row=2, column=1, padx=5, pady=5)
 
         # Profile image
+        self.image_bytes = image_bytes
         img = Image.open(io.BytesIO(image_bytes))
         img = img.resize((150, 150))
         self.tk_image = ImageTk.PhotoImage(img)
@@ -218,11 +475,24 @@ class ProfileReviewer(tk.Frame):
             return
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         filename = f"{name}_{timestamp}.jpg"
-        person_id = self.db_manager.add_person(name, occupation, age)
-        self.db_manager.add_image(person_id, filename, self.tk_image._PhotoImage__photo.zoom(1).tobytes(), timestamp)
-        save_image_for_model(name, self.tk_image._PhotoImage__photo.zoom(1).tobytes())
-        if self.log_callback:
-            self.log_callback(f"Profile added: {name}")
+        # Enrollment (dedup checks, detection, encoding) runs on the deduplicator's thread;
+        # the log line is posted through the toplevel because this reviewer is destroyed now
+        root = self.winfo_toplevel()
+        log_callback = self.log_callback
+        deduplicator = self.deduplicator
+
+        def done(image_id, reason, error):
+            if not log_callback:
+                return
+            if error:
+                message = f"Error adding profile {name}: {error}"
+            elif reason:
+                message = (f"Profile photo skipped for {name}: {deduplicator.describe(reason)} "
+                           f"({deduplicator.skipped()} duplicates skipped so far)")
+            else:
+                message = f"Profile added: {name}"
+            root.after(0, lambda: log_callback(message))
+        deduplicator.submit(name, occupation, age, filename, self.image_bytes, timestamp, done)
         self.destroy()
 
     def on_dont_add(self):
@@ -315,6 +585,7 @@ class ScraperFrame(tk.Frame):
     def __init__(self, parent, db_manager):
         super().__init__(parent, bg="black")
         self.db_manager = db_manager
+        self.deduplicator = deduplicator_from_config(db_manager)
 
         # Left panel for scraper UI (pop-ups)
         left_frame = tk.Frame(self, bg="black", width=400)
@@ -358,7 +629,8 @@ class ScraperFrame(tk.Frame):
             self.log("Scraping completed.")
 
     def show_profile_review(self, name, occupation, age, image_bytes):
-        reviewer = ProfileReviewer(self.review_container, name, occupation, age, image_bytes, self.db_manager, log_callback=self.log)
+        reviewer = ProfileReviewer(self.review_container, name, occupation, age, image_bytes, self.db_manager,
+                                   self.deduplicator, log_callback=self.log)
         reviewer.pack(fill="x", pady=5)
 
 ##############################
@@ -370,11 +642,13 @@ class CaptureFrame(tk.Frame):
         self.parent = parent
         self.camera = camera
         self.db_manager = db_manager
+        self.deduplicator = deduplicator_from_config(db_manager)
         self.running = False
 
         # Video feed on left
         self.video_label = tk.Label(self, bg="black")
         self.video_label.pack(side="left", padx=10, pady=10)
+        self.renderer = TkRenderer(self.video_label, (640, 480))
 
         # Form on right
         form_frame = tk.Frame(self, bg="black")
@@ -414,21 +688,25 @@ class CaptureFrame(tk.Frame):
         image_bytes = buffer.tobytes()
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         filename = f"{name}_{timestamp}.jpg"
-        person_id = self.db_manager.add_person(name, occupation, int(age))
-        self.db_manager.add_image(person_id, filename, image_bytes, timestamp)
-        messagebox.showinfo("Saved", f"Photo saved for {name}")
+        # Dedup checks and encoding run on the deduplicator's thread so the preview keeps running
+        self.deduplicator.submit(name, occupation, int(age), filename, image_bytes, timestamp,
+                                 lambda image_id, reason, error: self.after(0, lambda: self.show_enrollment(name, reason, error)))
+
+    def show_enrollment(self, name, reason, error):
+        if error:
+            messagebox.showerror("Error", f"Failed to save photo for {name}: {error}")
+        elif reason:
+            messagebox.showinfo("Skipped", f"Photo not saved for {name}: {self.deduplicator.describe(reason)}.\n"
+                                           f"{self.deduplicator.skipped()} duplicate photos skipped so far.")
+        else:
+            messagebox.showinfo("Saved", f"Photo saved for {name}")
 
     def update_frame(self):
         if not self.running:
             return
         try:
             frame = self.camera.capture_array()
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb)
-            img = img.resize((640, 480))
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk)
+            self.renderer.show(frame)
         except Exception as e:
             print(f"[CaptureFrame ERROR] {e}")
         self.after(10, self.update_frame)
@@ -458,83 +736,101 @@ class TrainFrame(tk.Frame):
         self.status_label.pack(pady=10)
 
     def start_training(self):
+        self.train_btn.config(state="disabled")
         self.status_label.config(text="Training in progress...")
         threading.Thread(target=self.train_model, daemon=True).start()
 
     def train_model(self):
-        rows = self.db_manager.get_all_images()
-        knownEncodings = []
-        knownNames = []
-        knownOccupations = []
-        knownAges = []
-        total = len(rows)
-        print(f"[TRAIN] Found {total} images in the database.")
-        for (i, row) in enumerate(rows):
-            print(f"[TRAIN] Processing image {i + 1}/{total}")
-            name, occupation, age, image_data = row
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            boxes = face_recognition.face_locations(rgb, model="hog")
-            encodings = face_recognition.face_encodings(rgb, boxes)
-            for encoding in encodings:
-                knownEncodings.append(encoding)
-                knownNames.append(name)
-                knownOccupations.append(occupation)
-                knownAges.append(age)
-        data = {
-            "encodings": knownEncodings,
-            "names": knownNames,
-            "occupations": knownOccupations,
-            "ages": knownAges
-        }
-        pickled_data = pickle.dumps(data)
-        self.db_manager.update_encodings(pickled_data)
+        # Runs on the training thread: any failure is shown on the page and the button comes back
+        try:
+            self.train()
+        except Exception as e:
+            print(f"[TRAIN ERROR] {e}")
+            message = f"Training failed: {e}"
+            self.after(0, lambda: self.status_label.config(text=message))
+        finally:
+            self.after(0, lambda: self.train_btn.config(state="normal"))
+
+    def train(self):
+        while self.db_manager.migration.is_alive():
+            moved, total = self.db_manager.migration_progress
+            self.after(0, lambda: self.status_label.config(text=f"Moving images into the blob store... {moved}/{total}"))
+            self.db_manager.migration.join(1.0)
+        # Incremental: only images that are new or whose bytes changed get encoded again.
+        # Rows are streamed from the database page by page while earlier ones are encoded.
+        stale_ids = self.db_manager.get_stale_trained_images()
+        self.db_manager.delete_trained_images(stale_ids)
+        total = self.db_manager.count_images()
+        pending_count = self.db_manager.count_images(pending_only=True)
+        print(f"[TRAIN] Found {total} images in the database, {pending_count} new or changed, {len(stale_ids)} removed.")
+
+        # encode_images pulls images ahead of the results, the ids wait here in the same order.
+        # Workers get the blob store paths and read (mmap) the files themselves.
+        pending = deque()
+        def sources():
+            for image_id, person_id, content_hash in self.db_manager.iter_images(pending_only=True):
+                pending.append((image_id, person_id, content_hash))
+                yield self.db_manager.blobs.path(content_hash)
+        for boxes, encodings in encode_images(sources(), config.TRAIN_WORKERS, self.report_progress, total=pending_count):
+            image_id, person_id, content_hash = pending.popleft()
+            self.db_manager.save_trained_image(image_id, person_id, content_hash, boxes, encodings)
+
+        # Re-cluster prototypes over the full per-face gallery
+        face_ids, person_ids, matrix = self.db_manager.get_gallery()
+        prototype_indices, outlier_indices = build_prototypes(matrix, person_ids, config.MAX_PROTOTYPES, config.PROTOTYPE_OUTLIER_DISTANCE)
+        self.db_manager.set_prototypes(face_ids[prototype_indices])
+        print(f"[TRAIN] {len(face_ids)} face encodings, {len(prototype_indices)} prototypes kept, {len(outlier_indices)} outlier faces rejected.")
+        # Export the gallery file used by the standalone recognizers
+        persons = self.db_manager.get_persons()
+        save_gallery(config.GALLERY_PATH, matrix, [persons[p][0] for p in person_ids], [persons[p][2] for p in person_ids],
+                     [persons[p][1] for p in person_ids], prototype_indices)
         print("[TRAIN] Training complete. Encodings updated in the database.")
-        self.status_label.config(text="Training complete.")
+        self.after(0, lambda: self.status_label.config(text="Training complete."))
+
+    def report_progress(self, done, total):
+        print(f"[TRAIN] Processing image {done}/{total}")
+        # Called from the training thread, so hand the label update to the Tk loop
+        self.after(0, lambda: self.status_label.config(text=f"Training in progress... {done}/{total} images"))
 
 ##############################
 # Recognition Page
 ##############################
 class RecognizeFrame(tk.Frame):
-    def __init__(self, parent, camera, db_manager):
+    def __init__(self, parent, camera, db_manager, metrics=None):
         super().__init__(parent, bg="black")
         self.parent = parent
         self.camera = camera
         self.db_manager = db_manager
+        self.metrics = metrics or LatencyMetrics(log_interval=0)
         self.running = False
 
-        self.engine = pyttsx3.init(driverName='espeak')
-        self.engine.setProperty('rate', 150)
-        self.speech_queue = []
-        self.speech_lock = threading.Lock()
-        self.last_spoken_name = None
-        threading.Thread(target=self.speech_worker, daemon=True).start()
+        self.announcer = announcer_from_config(self.metrics)
 
-        enc_data = self.db_manager.get_encodings()
-        if enc_data:
-            try:
-                data = pickle.loads(enc_data)
-                self.known_face_encodings = data["encodings"]
-                self.known_face_names = data["names"]
-                self.known_face_occupations = data.get("occupations", [])
-                self.known_face_ages = data.get("ages", [])
-            except Exception as e:
-                messagebox.showerror("Error", f"Error loading encodings: {e}")
-                self.known_face_encodings = []
-                self.known_face_names = []
-                self.known_face_occupations = []
-                self.known_face_ages = []
+        self.known_face_encodings = np.empty((0, 128), dtype=np.float32)
+        self.known_face_names = []
+        self.known_face_occupations = []
+        self.known_face_ages = []
+        try:
+            prototypes_only = config.GALLERY_MODE == "prototype"
+            _, person_ids, matrix = self.db_manager.get_gallery(prototypes_only)
+            if prototypes_only and len(matrix) == 0:
+                # Trained before prototypes existed, fall back to every face
+                _, person_ids, matrix = self.db_manager.get_gallery()
+            persons = self.db_manager.get_persons()
+            self.known_face_encodings = matrix
+            self.known_face_names = [persons[p][0] for p in person_ids]
+            self.known_face_occupations = [persons[p][1] for p in person_ids]
+            self.known_face_ages = [persons[p][2] for p in person_ids]
+        except Exception as e:
+            messagebox.showerror("Error", f"Error loading encodings: {e}")
         else:
-            messagebox.showerror("Error", "No encodings found in database. Please train the model first.")
-            self.known_face_encodings = []
-            self.known_face_names = []
-            self.known_face_occupations = []
-            self.known_face_ages = []
+            if len(self.known_face_encodings) == 0:
+                messagebox.showerror("Error", "No encodings found in database. Please train the model first.")
+        self.matcher = matcher_from_config(self.known_face_encodings, self.known_face_names)
 
         self.cv_scaler = 4
+        self.recognizer = recognizer_from_config(self.matcher, self.cv_scaler)
         self.face_locations = []
-        self.face_encodings = []
         self.face_names = []
         self.face_ages = []
         self.face_occupations = []
@@ -542,66 +838,52 @@ class RecognizeFrame(tk.Frame):
         self.start_time = time.time()
         self.fps = 0
 
+        # Capture and inference run on their own threads, the Tk loop only renders
+        self.pipeline = RecognitionPipeline(self.capture, self.run_inference, self.metrics)
+        self.rendered_seq = 0
+
         # Layout: details on left, video feed on right
         self.details_frame = tk.Frame(self, bg="black")
         self.details_frame.pack(side="left", padx=10, pady=10, fill="both", expand=False)
         self.details_label = tk.Label(self.details_frame, text="", font=("Helvetica", 16), bg="black", fg="white", justify="left")
         self.details_label.pack(padx=10, pady=10, fill="both", expand=True)
+        # Monospaced so the per-stage p50/p95/p99 columns line up
+        self.metrics_label = tk.Label(self.details_frame, text="", font=("Courier", 11), bg="black", fg="#AAAAAA", justify="left")
+        self.metrics_label.pack(padx=10, pady=10, fill="x", side="bottom")
 
         self.video_frame = tk.Frame(self, bg="black")
         self.video_frame.pack(side="right", padx=10, pady=10, fill="both", expand=True)
         self.video_label = tk.Label(self.video_frame, bg="black")
         self.video_label.pack(padx=10, pady=10)
-
-    def speech_worker(self):
-        while True:
-            if self.speech_queue:
-                with self.speech_lock:
-                    message = self.speech_queue.pop(0)
-                self.engine.say(message)
-                self.engine.runAndWait()
-            else:
-                time.sleep(0.1)
+        self.renderer = TkRenderer(self.video_label, (640, 480))
 
     def speak_name(self, name, age, occupation):
-        if name != "Unknown" and name != self.last_spoken_name:
-            message = f"Name: {name}, Age: {age}, Occupation: {occupation}"
-            with self.speech_lock:
-                self.speech_queue.append(message)
-            self.last_spoken_name = name
+        if name != "Unknown":
+            self.announcer.announce(name, f"Name: {name}, Age: {age}, Occupation: {occupation}")
 
     def process_frame(self, frame):
-        resized_frame = cv2.resize(frame, (0, 0), fx=1/self.cv_scaler, fy=1/self.cv_scaler)
-        rgb_resized = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-        self.face_locations = face_recognition.face_locations(rgb_resized)
-        self.face_encodings = face_recognition.face_encodings(rgb_resized, self.face_locations, model='large')
+        faces = self.recognizer.process_frame(frame)
+        self.face_locations = [face.box for face in faces]
         self.face_names = []
         self.face_ages = []
         self.face_occupations = []
-        for face_encoding in self.face_encodings:
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-            name = "Unknown"
+        for face in faces:
+            match = face.match
+            name = match.name
             age = "Unknown"
             occupation = "Unknown"
-            face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-            if len(face_distances) > 0:
-                best_index = np.argmin(face_distances)
-                if matches[best_index]:
-                    name = self.known_face_names[best_index]
-                    age = self.known_face_ages[best_index] if self.known_face_ages else "Unknown"
-                    occupation = self.known_face_occupations[best_index] if self.known_face_occupations else "Unknown"
+            if match.index >= 0:
+                age = self.known_face_ages[match.index] if self.known_face_ages else "Unknown"
+                occupation = self.known_face_occupations[match.index] if self.known_face_occupations else "Unknown"
             self.face_names.append(name)
             self.face_ages.append(age)
             self.face_occupations.append(occupation)
-            self.speak_name(name, age, occupation)
+            if face.announce:
+                self.speak_name(name, age, occupation)
         return frame
 
     def draw_results(self, frame):
         for (top, right, bottom, left), name in zip(self.face_locations, self.face_names):
-            top *= self.cv_scaler
-            right *= self.cv_scaler
-            bottom *= self.cv_scaler
-            left *= self.cv_scaler
             cv2.rectangle(frame, (left, top), (right, bottom), (244, 42, 3), 3)
             cv2.rectangle(frame, (left-3, top-30), (right+3, top), (244, 42, 3), cv2.FILLED)
             cv2.putText(frame, name, (left+6, top-8), cv2.FONT_HERSHEY_DUPLEX, 0.7, (255,255,255), 1)
@@ -616,29 +898,46 @@ class RecognizeFrame(tk.Frame):
             self.start_time = time.time()
         return self.fps
 
+    def capture(self):
+        # Runs on the pipeline's capture thread; slows down while the motion gate is idle
+        if self.recognizer.gate is not None:
+            self.recognizer.gate.throttle()
+        return self.camera.capture_array()
+
+    def run_inference(self, frame):
+        # Runs on the pipeline's inference thread; returns everything the GUI needs to render
+        self.process_frame(frame)
+        self.metrics.observe_all(self.recognizer.timings)
+        if self.recognizer.gate is not None:
+            self.metrics.set_gauge("idle", int(self.recognizer.gate.idle))
+        with self.metrics.time("draw"):
+            self.draw_results(frame)
+        current_fps = self.calculate_fps()
+        if self.face_names:
+            details = ""
+            for n, a, o in zip(self.face_names, self.face_ages, self.face_occupations):
+                details += f"Name: {n}\nAge: {a}\nOccupation: {o}\n\n"
+        else:
+            details = "No faces detected"
+        return frame, details, current_fps
+
     def update_frame(self):
         if not self.running:
             return
         try:
-            frame = self.camera.capture_array()
-            self.process_frame(frame)
-            self.draw_results(frame)
-            current_fps = self.calculate_fps()
-
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb)
-            img = img.resize((640, 480))
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk)
-
-            if self.face_names:
-                details = ""
-                for n, a, o in zip(self.face_names, self.face_ages, self.face_occupations):
-                    details += f"Name: {n}\nAge: {a}\nOccupation: {o}\n\n"
-            else:
-                details = "No faces detected"
-            self.details_label.config(text=f"{details}\nFPS: {current_fps:.2f}")
+            seq, result = self.pipeline.latest()
+            if result is not None and seq != self.rendered_seq:
+                self.rendered_seq = seq
+                frame, details, current_fps = result.output
+                render_start = time.perf_counter()
+                self.renderer.show(frame)
+
+                now = time.perf_counter()
+                self.metrics.observe("render", (now - render_start) * 1000.0)
+                self.metrics.observe("end_to_end", (now - result.captured_at) * 1000.0)
+                self.metrics.maybe_log()
+                self.details_label.config(text=f"{details}\nFPS: {current_fps:.2f}")
+                self.metrics_label.config(text="\n".join(["Latency"] + self.metrics.format_lines()))
         except Exception as e:
             print(f"[RecognizeFrame ERROR] {e}")
         self.after(10, self.update_frame)
@@ -646,16 +945,19 @@ class RecognizeFrame(tk.Frame):
     def start_camera(self):
         if not self.running:
             self.running = True
+            if self.camera:
+                self.pipeline.start()
             self.update_frame()
 
     def stop_camera(self):
         self.running = False
+        self.pipeline.stop()
 
 ##############################
 # Main App with Navigation
 ##############################
 class MainApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, source=config.FRAME_SOURCE, fps=config.SOURCE_FPS, metrics_port=config.METRICS_PORT, loop=True):
         super().__init__()
         self.title("Face Recognition Suite")
         self.geometry("1300x700")
@@ -678,10 +980,7 @@ class MainApp(tk.Tk):
 
         # Create a shared camera instance
         try:
-            self.camera = Picamera2()
-            self.camera.configure(self.camera.create_preview_configuration(
-                main={"format": 'XRGB8888', "size": (640, 480)}
-            ))
+            self.camera = open_source(source, size=(640, 480), fps=fps, loop=loop)
             self.camera.start()
         except Exception as e:
             messagebox.showerror("Camera Error", f"Failed to initialize camera: {e}")
@@ -709,7 +1008,8 @@ class MainApp(tk.Tk):
         self.frames = {}
         self.frames["capture"] = CaptureFrame(container, self.camera, self.db_manager) if self.camera else CaptureFrame(container, None, self.db_manager)
         self.frames["train"] = TrainFrame(container, self.db_manager)
-        self.frames["recognize"] = RecognizeFrame(container, self.camera, self.db_manager) if self.camera else RecognizeFrame(container, None, self.db_manager)
+        self.metrics = metrics_from_config(metrics_port, prefix="[RecognizeFrame]")
+        self.frames["recognize"] = RecognizeFrame(container, self.camera, self.db_manager, self.metrics)
         self.frames["scraper"] = ScraperFrame(container, self.db_manager)
         for frame in self.frames.values():
             frame.grid(row=0, column=0, sticky="nsew")
@@ -732,9 +1032,12 @@ class MainApp(tk.Tk):
     def on_close(self):
         if self.camera:
             self.camera.stop()
+        self.metrics.close()
         self.db_manager.close()
         self.destroy()
 
 if __name__ == "__main__":
-    app = MainApp()
+    parser = add_source_arguments(argparse.ArgumentParser(description="Face Recognition Suite"))
+    args = add_metrics_arguments(parser).parse_args()
+    app = MainApp(source=args.source, fps=args.fps, metrics_port=args.metrics_port, loop=not args.no_loop)
     app.mainloop()
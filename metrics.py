@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import config
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+##############################
+# Rolling latency histograms
+##############################
+# Keeps the last `window` samples (milliseconds) of every stage so p50/p95/p99
+# follow the current load instead of averaging over the whole run. Stages are
+# fed from FaceRecognizer.timings, the pipeline timings and whatever the caller
+# times itself (drawing, Tk conversion, ...). Safe to use from several threads.
+class RollingHistogram:
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+
+    def quantiles(self):
+        if not self.samples:
+            return [0.0] * len(QUANTILES)
+        return [float(v) for v in np.percentile(np.fromiter(self.samples, dtype=np.float64), [q * 100 for q in QUANTILES])]
+
+class CpuUsage:
+    # Process CPU time (all threads) as a percentage of one core since the last call
+    def __init__(self):
+        self.last_wall = time.perf_counter()
+        self.last_cpu = time.process_time()
+
+    def percent(self):
+        wall, cpu = time.perf_counter(), time.process_time()
+        elapsed = wall - self.last_wall
+        value = 100.0 * (cpu - self.last_cpu) / elapsed if elapsed > 0 else 0.0
+        self.last_wall, self.last_cpu = wall, cpu
+        return value
+
+# Gauges (CPU usage, idle state, ...) are single values reported next to the stages
+class LatencyMetrics:
+    def __init__(self, window=500, log_interval=10.0, prefix="[METRICS]"):
+        self.window = window
+        self.log_interval = log_interval
+        self.prefix = prefix
+        self.stages = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.last_log = time.monotonic()
+        self.cpu = CpuUsage()
+        self.last_cpu = time.monotonic()
+        self.server = None
+
+    def observe(self, stage, ms):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = RollingHistogram(self.window)
+            self.stages[stage].observe(ms)
+
+    def observe_all(self, timings):
+        for stage, ms in timings.items():
+            self.observe(stage, ms)
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def update_cpu(self, every=1.0):
+        now = time.monotonic()
+        if now - self.last_cpu >= every:
+            self.last_cpu = now
+            self.set_gauge("cpu_percent", self.cpu.percent())
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000.0)
+
+    def summary(self):
+        # {stage: (p50, p95, p99, count)} in milliseconds
+        with self.lock:
+            return {stage: (*hist.quantiles(), hist.count) for stage, hist in self.stages.items()}
+
+    def format_lines(self):
+        lines = [f"{stage:<11} p50 {p50:6.1f}  p95 {p95:6.1f}  p99 {p99:6.1f} ms"
+                 for stage, (p50, p95, p99, _) in self.summary().items()]
+        with self.lock:
+            gauges = dict(self.gauges)
+        if gauges:
+            lines.append("  ".join(f"{name} {value:.1f}" if isinstance(value, float) else f"{name} {value}"
+                                   for name, value in gauges.items()))
+        return lines
+
+    def maybe_log(self):
+        # Prints one line per stage every `log_interval` seconds; cheap to call every frame
+        self.update_cpu()
+        now = time.monotonic()
+        if not self.log_interval or now - self.last_log < self.log_interval:
+            return
+        self.last_log = now
+        for line in self.format_lines():
+            print(f"{self.prefix} {line}")
+
+    # === Prometheus text exposition ===
+    def prometheus_text(self):
+        with self.lock:
+            stages = [(stage, hist.quantiles(), hist.count, hist.total) for stage, hist in self.stages.items()]
+            gauges = dict(self.gauges)
+        lines = ["# HELP face_recognition_stage_seconds Per-stage latency over the last samples of the recognition loop",
+                 "# TYPE face_recognition_stage_seconds summary"]
+        for stage, quantiles, count, total in stages:
+            for q, value in zip(QUANTILES, quantiles):
+                lines.append(f'face_recognition_stage_seconds{{stage="{stage}",quantile="{q}"}} {value / 1000.0:.6f}')
+            lines.append(f'face_recognition_stage_seconds_sum{{stage="{stage}"}} {total / 1000.0:.6f}')
+            lines.append(f'face_recognition_stage_seconds_count{{stage="{stage}"}} {count}')
+        for name, value in gauges.items():
+            lines.append(f"# TYPE face_recognition_{name} gauge")
+            lines.append(f"face_recognition_{name} {float(value):.6f}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        # Serves /metrics on a daemon thread; bound to localhost unless told otherwise
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"[INFO] Metrics on http://{host}:{self.server.server_port}/metrics")
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+
+# === Build metrics with the settings from config.py ===
+def metrics_from_config(port=None, prefix="[METRICS]"):
+    metrics = LatencyMetrics(window=config.METRICS_WINDOW, log_interval=config.METRICS_LOG_INTERVAL, prefix=prefix)
+    port = config.METRICS_PORT if port is None else port
+    if port:
+        try:
+            metrics.serve(port)
+        except OSError as e:
+            print(f"[WARN] Could not start metrics endpoint on port {port}: {e}")
+    return metrics
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT,
+                        help="Serve Prometheus-style latency metrics on this local port")
+    return parser
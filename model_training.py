@@ -1,9 +1,10 @@
 import os
 import json
 from imutils import paths
-import face_recognition
-import pickle
-import cv2
+import config
+from gallery_file import save_gallery
+from prototypes import build_prototypes
+from training import encode_images
 
 def load_metadata(imagePath):
     metadata_file = os.path.join("dataset", imagePath.split(os.path.sep)[-2], "metadata.json")
@@ -15,40 +16,36 @@ def load_metadata(imagePath):
                     return entry["occupation"], entry["age"]
     return None, None  # Default if no metadata found
 
-print("[INFO] Start processing faces...")
-imagePaths = list(paths.list_images("dataset"))
-knownEncodings = []
-knownNames = []
-knownOccupations = []
-knownAges = []
-
-for (i, imagePath) in enumerate(imagePaths):
-    print(f"[INFO] Processing image {i + 1}/{len(imagePaths)}")
-    name = imagePath.split(os.path.sep)[-2]
-    occupation, age = load_metadata(imagePath)
-    
-    image = cv2.imread(imagePath)
-    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    boxes = face_recognition.face_locations(rgb, model="hog")
-    encodings = face_recognition.face_encodings(rgb, boxes)
+def report_progress(done, total):
+    print(f"[INFO] Processing image {done}/{total}")
+
+# Guarded so the forkserver training workers can import this script without re-running it
+def main():
+    print("[INFO] Start processing faces...")
+    imagePaths = list(paths.list_images("dataset"))
+    knownEncodings = []
+    knownNames = []
+    knownOccupations = []
+    knownAges = []
+
+    # Decode, detect and encode on every core; results come back in imagePaths order
+    for imagePath, (_, encodings) in zip(imagePaths, encode_images(imagePaths, config.TRAIN_WORKERS, report_progress)):
+        name = imagePath.split(os.path.sep)[-2]
+        occupation, age = load_metadata(imagePath)
     
-    for encoding in encodings:
-        knownEncodings.append(encoding)
-        knownNames.append(name)
-        knownOccupations.append(occupation)
-        knownAges.append(age)
+        for encoding in encodings:
+            knownEncodings.append(encoding)
+            knownNames.append(name)
+            knownOccupations.append(occupation)
+            knownAges.append(age)
 
-print("[INFO] Serializing encodings...")
-data = {
-    "encodings": knownEncodings,
-    "names": knownNames,
-    "occupations": knownOccupations,
-    "ages": knownAges
-}
+    print("[INFO] Serializing encodings...")
+    prototype_indices, outlier_indices = build_prototypes(knownEncodings, knownNames, config.MAX_PROTOTYPES, config.PROTOTYPE_OUTLIER_DISTANCE)
+    print(f"[INFO] {len(prototype_indices)} prototypes kept, {len(outlier_indices)} outlier faces rejected")
 
-with open("encodings.pickle", "wb") as f:
-    f.write(pickle.dumps(data))
+    save_gallery(config.GALLERY_PATH, knownEncodings, knownNames, knownAges, knownOccupations, prototype_indices)
 
-print("[INFO] Training complete. Encodings saved to 'encodings.pickle'")
+    print(f"[INFO] Training complete. Encodings saved to '{config.GALLERY_PATH}'")
 
+if __name__ == "__main__":
+    main()
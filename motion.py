@@ -0,0 +1,120 @@
+import time
+import cv2
+import numpy as np
+
+##############################
+# Motion detection on a thumbnail
+##############################
+# Compares a tiny blurred grayscale thumbnail of each frame with the previous
+# one. Working at ~80 pixels wide makes this a fraction of a millisecond even
+# for 1080p frames, and the blur plus threshold ignore sensor noise.
+#
+# After update(), `mask` marks the changed thumbnail pixels and `changed` is the
+# fraction of the thumbnail that changed. Boxes passed to motion_outside() are
+# (top, right, bottom, left) in the coordinates of the frame given to update().
+class MotionDetector:
+    def __init__(self, thumb_width=80, threshold=25, min_area=0.01):
+        self.thumb_width = thumb_width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.prev = None
+        self.mask = None
+        self.changed = 0.0
+        self.scale = 1.0
+
+    def thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        self.scale = self.thumb_width / float(width)
+        size = (self.thumb_width, max(1, int(round(height * self.scale))))
+        thumb = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGRA2GRAY if thumb.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(thumb, (5, 5), 0)
+
+    def update(self, frame):
+        # Returns True if enough of the frame changed since the previous call
+        thumb = self.thumbnail(frame)
+        if self.prev is None or self.prev.shape != thumb.shape:
+            self.prev = thumb
+            self.mask = np.ones(thumb.shape, dtype=bool)
+            self.changed = 1.0
+            return True
+        self.mask = cv2.absdiff(thumb, self.prev) > self.threshold
+        self.prev = thumb
+        self.changed = float(self.mask.mean())
+        return self.changed >= self.min_area
+
+    def motion_outside(self, boxes):
+        # True if the changed area outside the given boxes is at least min_area
+        if self.mask is None:
+            return True
+        outside = self.mask.copy()
+        height, width = outside.shape
+        for top, right, bottom, left in boxes:
+            y0, y1 = max(0, int(top * self.scale)), min(height, int(np.ceil(bottom * self.scale)))
+            x0, x1 = max(0, int(left * self.scale)), min(width, int(np.ceil(right * self.scale)))
+            outside[y0:y1, x0:x1] = False
+        return outside.mean() >= self.min_area
+
+##############################
+# Motion gate
+##############################
+# Decides per frame whether the recognizer has to run at all. While the scene
+# moves (and for `hold` seconds after), every frame passes. Once it has been
+# static that long the gate goes idle: frames are only compared against the
+# previous thumbnail, one frame still passes every `recheck` seconds, and
+# idle_delay() asks the capture loop to slow down to `idle_fps`. The first
+# frame with motion wakes it up again and passes straight through.
+#
+# Wake-up latency is measured from the last static check before the motion
+# (the earliest the motion can have started) to the end of the first processed
+# frame, so it includes the idle capture interval.
+class MotionGate:
+    def __init__(self, detector=None, hold=2.0, recheck=5.0, idle_fps=4.0):
+        self.detector = detector or MotionDetector()
+        self.hold = hold
+        self.recheck = recheck
+        self.idle_fps = idle_fps
+        self.idle = False
+        self.last_motion = None
+        self.last_run = None
+        self.last_check = None
+        self.wake_from = None
+        self.passed = 0
+        self.skipped = 0
+
+    def check(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        if self.detector.update(frame):
+            if self.idle:
+                self.idle = False
+                self.wake_from = self.last_check
+            self.last_motion = now
+        elif not self.idle and (self.last_motion is None or now - self.last_motion > self.hold):
+            self.idle = True
+        self.last_check = now
+        run = not self.idle or self.last_run is None or now - self.last_run >= self.recheck
+        if run:
+            self.last_run = now
+            self.passed += 1
+        else:
+            self.skipped += 1
+        return run
+
+    def processed(self, now=None):
+        # Call after a frame that passed has been processed; returns the wake-up latency (ms) once per wake-up
+        if self.wake_from is None:
+            return None
+        now = time.monotonic() if now is None else now
+        latency = (now - self.wake_from) * 1000.0
+        self.wake_from = None
+        return latency
+
+    def idle_delay(self):
+        # Seconds the capture loop should wait before the next frame
+        return 1.0 / self.idle_fps if self.idle and self.idle_fps else 0.0
+
+    def throttle(self):
+        delay = self.idle_delay()
+        if delay:
+            time.sleep(delay)
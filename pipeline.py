@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import namedtuple
+
+# output is whatever `process` returned, timings holds milliseconds per stage
+PipelineResult = namedtuple("PipelineResult", ["output", "captured_at", "timings"])
+
+##############################
+# Latest-frame slot
+##############################
+# A one-item mailbox: put() overwrites whatever was there, so a slow consumer
+# always gets the newest item and stale ones are dropped instead of queueing up.
+class LatestSlot:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+
+    def put(self, item):
+        with self._cond:
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, after_seq=0, timeout=None):
+        # Waits for an item newer than `after_seq`; returns (seq, item) or (after_seq, None) on timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq, timeout):
+                return after_seq, None
+            return self._seq, self._item
+
+    def clear(self):
+        # Drops the item but keeps the sequence number, so waiting readers stay consistent
+        with self._cond:
+            self._item = None
+
+    def peek(self):
+        with self._cond:
+            return self._seq, self._item
+
+##############################
+# Capture -> inference pipeline
+##############################
+# A capture thread keeps the latest camera frame in a slot, an inference thread
+# processes the newest frame (skipping any it was too slow for) and publishes
+# the result to a second slot. The GUI only ever reads the latest result, so
+# its latency no longer depends on how long inference takes. Stage timings are
+# also fed to `metrics` (a LatencyMetrics) when one is given.
+#
+# The two threads are started once and paused by stop() instead of exiting, so
+# start() never has to join them on the Tk thread. stop() does wait for a
+# capture that is already in progress (at most one camera frame, never for
+# inference), so other pages can use the camera as soon as it returns.
+class RecognitionPipeline:
+    def __init__(self, capture, process, metrics=None):
+        self.capture = capture
+        self.process = process
+        self.metrics = metrics
+        self.frames = LatestSlot()
+        self.results = LatestSlot()
+        self.active = threading.Event()
+        self.session = 0
+        self.capture_lock = threading.Lock()
+        self.threads = []
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+
+    @property
+    def running(self):
+        return self.active.is_set()
+
+    def start(self):
+        # Nothing from the previous session may be shown: drop its last frame and result
+        self.session += 1
+        self.frames.clear()
+        self.results.clear()
+        self.active.set()
+        if not self.threads:
+            self.threads = [threading.Thread(target=self._capture_loop, daemon=True),
+                            threading.Thread(target=self._inference_loop, daemon=True)]
+            for thread in self.threads:
+                thread.start()
+
+    def stop(self):
+        self.active.clear()
+        # Wait out an in-flight capture_array(); inference finishes in the background
+        with self.capture_lock:
+            pass
+
+    def _capture_loop(self):
+        while True:
+            self.active.wait()
+            with self.capture_lock:
+                if not self.active.is_set():
+                    continue
+                try:
+                    start = time.perf_counter()
+                    frame = self.capture()
+                    captured_at = time.perf_counter()
+                except Exception as e:
+                    print(f"[Pipeline capture ERROR] {e}")
+                    time.sleep(0.1)
+                    continue
+            self.frames.put((frame, captured_at, (captured_at - start) * 1000.0))
+            self.captured += 1
+
+    def _inference_loop(self):
+        seq = 0
+        while True:
+            self.active.wait()
+            new_seq, item = self.frames.get(seq, timeout=0.5)
+            if item is None or not self.active.is_set():
+                continue
+            self.dropped += new_seq - seq - 1
+            seq = new_seq
+            frame, captured_at, capture_ms = item
+            session = self.session
+            start = time.perf_counter()
+            try:
+                output = self.process(frame)
+            except Exception as e:
+                print(f"[Pipeline inference ERROR] {e}")
+                continue
+            done = time.perf_counter()
+            timings = {
+                "capture": capture_ms,
+                "queue": (start - captured_at) * 1000.0,
+                "inference": (done - start) * 1000.0,
+            }
+            if self.metrics is not None:
+                self.metrics.observe_all(timings)
+            if session != self.session:
+                # Finished after a stop()/start(), the frame belongs to the old session
+                continue
+            self.results.put(PipelineResult(output, captured_at, timings))
+            self.processed += 1
+
+    def latest(self):
+        # (seq, PipelineResult or None); compare seq to skip re-rendering the same result
+        return self.results.peek()
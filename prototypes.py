@@ -0,0 +1,53 @@
+import numpy as np
+
+##############################
+# Prototype Gallery
+##############################
+# Reduces every identity to at most `max_prototypes` medoids. Photos whose face
+# sits further than `outlier_distance` from the person's medoid (e.g. strangers
+# picked up in a group photo) are rejected before clustering. Medoids are real
+# rows of the full gallery, so only their indices need to be stored and the
+# full set stays available for re-clustering.
+
+def _distance_matrix(x):
+    sq = np.einsum("ij,ij->i", x, x)
+    d = sq[:, None] + sq[None, :] - 2.0 * (x @ x.T)
+    np.maximum(d, 0.0, out=d)
+    return np.sqrt(d, out=d)
+
+def _k_medoids(dists, k, n_iter=10):
+    # Farthest-point initialisation starting from the overall medoid
+    medoids = [int(np.argmin(dists.sum(axis=1)))]
+    while len(medoids) < k:
+        medoids.append(int(np.argmax(dists[:, medoids].min(axis=1))))
+    medoids = np.array(medoids)
+    for _ in range(n_iter):
+        assign = np.argmin(dists[:, medoids], axis=1)
+        updated = medoids.copy()
+        for c in range(k):
+            members = np.flatnonzero(assign == c)
+            if members.size:
+                updated[c] = members[np.argmin(dists[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return medoids
+
+def build_prototypes(encodings, names, max_prototypes=3, outlier_distance=0.6):
+    matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    names = np.asarray(names, dtype=object)
+    prototype_indices = []
+    outlier_indices = []
+    for name in dict.fromkeys(names.tolist()):
+        rows = np.flatnonzero(names == name)
+        dists = _distance_matrix(matrix[rows])
+        # Need at least 3 photos to tell which one is the odd one out
+        if rows.size >= 3:
+            medoid = int(np.argmin(dists.sum(axis=1)))
+            inliers = dists[medoid] <= outlier_distance
+            outlier_indices.extend(rows[~inliers].tolist())
+            rows = rows[inliers]
+            dists = dists[np.ix_(inliers, inliers)]
+        k = min(max_prototypes, rows.size)
+        prototype_indices.extend(sorted(rows[_k_medoids(dists, k)].tolist()))
+    return prototype_indices, outlier_indices
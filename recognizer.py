@@ -0,0 +1,315 @@
+import time
+import cv2
+import numpy as np
+from contextlib import contextmanager
+from collections import namedtuple
+from tracking import FaceTracker, IdentityCache, iou
+from scaling import AdaptiveScaler
+from motion import MotionDetector, MotionGate
+from detectors import DlibDetector, detector_from_config
+from encoding import BatchEncoder
+import config
+
+# box is (top, right, bottom, left) in full-frame coordinates.
+# announce is True on the frame where a known identity should be spoken.
+FaceResult = namedtuple("FaceResult", ["box", "match", "track_id", "announce"])
+
+##############################
+# Face Recognizer
+##############################
+# Detection + encoding + matching shared by RecognizeFrame and the standalone
+# recognizers. With tracking enabled, full detection only runs every
+# `detect_every` frames (or when a track is lost) and boxes are carried by
+# the tracker in between, keeping their identity labels. An identity cache
+# lets a track that has not moved reuse its last identity instead of being
+# re-encoded, and each track is announced once its identity is stable.
+#
+# With a `scaler` (AdaptiveScaler) the detection downscale is re-chosen on every
+# detection frame instead of staying at `cv_scaler`. With `full_res_encoding`
+# faces found on the downscaled frame are encoded from a crop of the original
+# frame, so small faces keep their detail.
+#
+# With `roi` enabled, detection only searches windows around the faces of the
+# previous detection (grown by `roi_margin` of the face size on every side), each
+# upscaled to at least `roi_min_size` pixels. The whole frame is still scanned
+# every `full_scan_every` detections, when there were no faces, when `motion` (a
+# MotionDetector) sees changes outside the windows, e.g. someone walking into
+# view, and in the same frame when a window no longer contains its face.
+#
+# A `gate` (MotionGate) skips the whole frame while the scene is static and
+# returns the previous faces instead; the wake-up latency after motion is
+# reported as the "wake" timing.
+#
+# process_frames() is the batch path: no tracking, the faces of all frames are
+# encoded in one batch and matched at once.
+#
+# `timings` holds the milliseconds spent per stage on the last processed frame.
+class FaceRecognizer:
+    def __init__(self, matcher, cv_scaler=4, tracking=False, detect_every=5, encoding_model="large", identity_cache=None,
+                 scaler=None, full_res_encoding=False, roi=False, roi_margin=0.5, roi_min_size=80, full_scan_every=10,
+                 motion=None, gate=None, detector=None, encode_batch_size=32):
+        self.matcher = matcher
+        self.cv_scaler = cv_scaler
+        self.encoding_model = encoding_model
+        self.encoder = BatchEncoder(model=encoding_model, batch_size=encode_batch_size)
+        self.tracker = FaceTracker(detect_every=detect_every) if tracking else None
+        self.cache = (identity_cache or IdentityCache()) if tracking else None
+        self.scaler = scaler
+        self.full_res_encoding = full_res_encoding
+        self.frame = None
+        self.roi = roi
+        self.roi_margin = roi_margin
+        self.roi_min_size = roi_min_size
+        self.full_scan_every = full_scan_every
+        self.motion = (motion or MotionDetector()) if roi else None
+        self.scans_since_full = 0
+        self.last_boxes = []
+        self.last_scan = None
+        self.gate = gate
+        self.detector = detector or DlibDetector("hog")
+        self.last_results = []
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+
+    def detect(self, rgb_small):
+        with self.stage("detect"):
+            windows = self.roi_windows(rgb_small)
+            boxes = []
+            pixels = 0
+            if windows is not None:
+                for window in windows:
+                    found, scanned = self.detect_window(rgb_small, window)
+                    boxes.extend(found)
+                    pixels += scanned
+                self.scans_since_full += 1
+                self.last_scan = "roi"
+                if self.missed_previous(boxes):
+                    # A face from the last detection is not in its window any more;
+                    # scan the whole frame now instead of dropping its track
+                    windows = None
+            if windows is None:
+                boxes = self.detector.detect(rgb_small)
+                pixels += rgb_small.shape[0] * rgb_small.shape[1]
+                self.scans_since_full = 0
+                self.last_scan = "full"
+        if self.scaler is not None:
+            heights = [(bottom - top) * self.cv_scaler for top, _, bottom, _ in boxes]
+            self.scaler.observe(self.timings["detect"], pixels, heights)
+        return boxes
+
+    def detect_window(self, rgb_small, window):
+        # Returns (boxes in frame coordinates, pixels scanned). Windows smaller than
+        # roi_min_size are upscaled first: a tight window around a small face is below
+        # what the detector can find (HOG scans with an 80x80 template) even though
+        # the same face is found in the full frame.
+        top, right, bottom, left = window
+        crop = rgb_small[top:bottom, left:right]
+        scale = max(1.0, self.roi_min_size / min(crop.shape[:2]))
+        if scale > 1.0:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        else:
+            crop = np.ascontiguousarray(crop)
+        boxes = [(int(round(t / scale)) + top, int(round(r / scale)) + left, int(round(b / scale)) + top,
+                  int(round(l / scale)) + left) for t, r, b, l in self.detector.detect(crop)]
+        return boxes, crop.shape[0] * crop.shape[1]
+
+    def previous_boxes(self):
+        return [t.box for t in self.tracker.tracks] if self.tracker is not None else self.last_boxes
+
+    def missed_previous(self, boxes):
+        return any(all(iou(previous, box) == 0 for box in boxes) for previous in self.previous_boxes())
+
+    def roi_windows(self, rgb_small):
+        # Windows to search on this detection, or None for a full-frame scan
+        if not self.roi:
+            return None
+        motion_seen = self.motion.update(rgb_small)
+        previous = self.previous_boxes()
+        if not previous or self.scans_since_full + 1 >= self.full_scan_every:
+            return None
+        height, width = rgb_small.shape[:2]
+        windows = []
+        for top, right, bottom, left in previous:
+            grow_y = int((bottom - top) * self.roi_margin)
+            grow_x = int((right - left) * self.roi_margin)
+            windows.append((max(0, top - grow_y), min(width, right + grow_x), min(height, bottom + grow_y), max(0, left - grow_x)))
+        windows = merge_windows(windows)
+        if motion_seen and self.motion.motion_outside(windows):
+            return None
+        return windows
+
+    def encode(self, rgb_small, boxes):
+        if not boxes:
+            return []
+        with self.stage("encode"):
+            return list(self.encoder.encode_chips(self.face_chips(rgb_small, boxes)))
+
+    def face_chips(self, rgb_small, boxes):
+        if self.full_res_encoding and self.frame is not None and self.cv_scaler != 1:
+            return [self.full_res_chip(box) for box in boxes]
+        return self.encoder.chips(rgb_small, boxes)
+
+    def full_res_chip(self, box):
+        # Aligned chip of one face from the full-resolution frame; only a margin
+        # around the face is converted so the cost doesn't grow with the frame size
+        top, right, bottom, left = self.scale_box(box)
+        height, width = self.frame.shape[:2]
+        margin = (bottom - top) // 4
+        y0, y1 = max(0, top - margin), min(height, bottom + margin)
+        x0, x1 = max(0, left - margin), min(width, right + margin)
+        crop = cv2.cvtColor(self.frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+        local_box = (top - y0, right - x0, bottom - y0, left - x0)
+        return self.encoder.chips(crop, [local_box])[0]
+
+    def match(self, encodings):
+        with self.stage("match"):
+            return self.matcher.match(encodings)
+
+    def identify(self, rgb_small, boxes):
+        return self.match(self.encode(rgb_small, boxes))
+
+    def scale_box(self, box):
+        return tuple(int(round(v * self.cv_scaler)) for v in box)
+
+    def process_frames(self, frames):
+        # Returns one list of FaceResults per frame; `timings` are totals for all frames
+        self.timings = {}
+        chips = []
+        frame_boxes = []
+        for frame in frames:
+            self.frame = frame
+            with self.stage("resize"):
+                small = cv2.resize(frame, (0, 0), fx=1/self.cv_scaler, fy=1/self.cv_scaler)
+                rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            boxes = self.detect(rgb_small)
+            with self.stage("encode"):
+                chips.extend(self.face_chips(rgb_small, boxes))
+            frame_boxes.append(boxes)
+        with self.stage("encode"):
+            encodings = self.encoder.encode_chips(chips)
+        matches = iter(self.match(encodings))
+        return [[FaceResult(self.scale_box(box), match, None, match.index >= 0) for box, match in zip(boxes, matches)]
+                for boxes in frame_boxes]
+
+    def update_scale(self, frame):
+        # Only called on detection frames, so tracked boxes never mix scales
+        scaler = self.scaler.choose(frame.shape)
+        if scaler == self.cv_scaler:
+            return
+        self.last_boxes = []
+        if self.tracker is not None:
+            factor = self.cv_scaler / scaler
+            self.tracker.rescale(factor)
+            self.cache.rescale(factor)
+        self.cv_scaler = scaler
+
+    def process_frame(self, frame):
+        self.timings = {}
+        if self.gate is not None:
+            with self.stage("gate"):
+                run = self.gate.check(frame)
+            if not run:
+                if self.scaler is not None:
+                    self.scaler.pause()
+                return [face._replace(announce=False) for face in self.last_results]
+        self.last_results = self.recognize(frame)
+        if self.gate is not None:
+            wake = self.gate.processed()
+            if wake is not None:
+                self.timings["wake"] = wake
+        return self.last_results
+
+    def recognize(self, frame):
+        self.frame = frame
+        if self.scaler is not None:
+            self.scaler.tick()
+            if self.tracker is None or self.tracker.needs_detection():
+                self.update_scale(frame)
+        with self.stage("resize"):
+            small = cv2.resize(frame, (0, 0), fx=1/self.cv_scaler, fy=1/self.cv_scaler)
+            rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+        if self.tracker is None:
+            boxes = self.detect(rgb_small)
+            self.last_boxes = boxes
+            matches = self.identify(rgb_small, boxes)
+            return [FaceResult(self.scale_box(box), match, None, match.index >= 0) for box, match in zip(boxes, matches)]
+
+        with self.stage("resize"):
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self.tracker.needs_detection():
+            detections = self.detect(rgb_small)
+            with self.stage("track"):
+                unstable = {t.id for t in self.tracker.tracks if not self.cache.is_stable(t.id)}
+                pending = self.tracker.update(gray, detections, unstable)
+            self.identify_tracks(rgb_small, pending)
+        else:
+            with self.stage("track"):
+                self.tracker.propagate(gray)
+
+        results = []
+        for track in self.tracker.tracks:
+            announce = False
+            if track.match.index >= 0 and self.cache.is_stable(track.id) and track.announced != track.match.identity:
+                track.announced = track.match.identity
+                announce = True
+            results.append(FaceResult(self.scale_box(track.box), track.match, track.id, announce))
+        return results
+
+    def identify_tracks(self, rgb_small, pending):
+        now = time.monotonic()
+        to_encode = []
+        for track in pending:
+            cached = self.cache.lookup(track.id, track.box, now)
+            if cached is not None:
+                track.assign(cached)
+            else:
+                to_encode.append(track)
+        encodings = self.encode(rgb_small, [t.box for t in to_encode])
+        for track, encoding, match in zip(to_encode, encodings, self.match(encodings)):
+            track.assign(self.cache.store(track.id, track.box, encoding, match, now))
+        self.cache.prune({t.id for t in self.tracker.tracks})
+
+def merge_windows(windows):
+    # Union overlapping windows so no area is scanned twice
+    merged = list(windows)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if a[0] < b[2] and b[0] < a[2] and a[3] < b[1] and b[3] < a[1]:
+                    merged[i] = (min(a[0], b[0]), max(a[1], b[1]), max(a[2], b[2]), min(a[3], b[3]))
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+# === Build a recognizer with the tracking settings from config.py ===
+def recognizer_from_config(matcher, cv_scaler=4):
+    cache = IdentityCache(ttl=config.IDENTITY_TTL, move_iou=config.IDENTITY_MOVE_IOU, window=config.IDENTITY_VOTE_WINDOW,
+                          confident_distance=config.IDENTITY_CONFIDENT_DISTANCE)
+    scaler = None
+    gate = None
+    if config.MOTION_GATE:
+        gate = MotionGate(MotionDetector(threshold=config.MOTION_THRESHOLD, min_area=config.MOTION_MIN_AREA),
+                          hold=config.GATE_HOLD, recheck=config.GATE_RECHECK, idle_fps=config.GATE_IDLE_FPS)
+    if config.ADAPTIVE_SCALE:
+        scaler = AdaptiveScaler(target_fps=config.TARGET_FPS, levels=config.SCALER_LEVELS, initial=cv_scaler,
+                                min_face=config.MIN_FACE_SIZE)
+    return FaceRecognizer(matcher, cv_scaler=cv_scaler, tracking=config.TRACKING, detect_every=config.DETECT_EVERY,
+                          identity_cache=cache, scaler=scaler, full_res_encoding=config.FULL_RES_ENCODING,
+                          roi=config.ROI_DETECTION, roi_margin=config.ROI_MARGIN, roi_min_size=config.ROI_MIN_SIZE,
+                          full_scan_every=config.ROI_FULL_SCAN_EVERY,
+                          motion=MotionDetector(threshold=config.MOTION_THRESHOLD, min_area=config.MOTION_MIN_AREA), gate=gate,
+                          detector=detector_from_config(), encode_batch_size=config.ENCODE_BATCH_SIZE)
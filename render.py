@@ -0,0 +1,51 @@
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+##############################
+# Tk frame renderer
+##############################
+# Shows camera frames in a Tk label without allocating new images every tick.
+# PhotoImage.paste() only hands an image straight to Tk when it is a single
+# memory block of the PhotoImage's own mode; anything else (e.g. an RGBA image
+# wrapped around a numpy array) makes it allocate a fresh block and convert into
+# it on every call. So the renderer keeps one RGB block image and decodes each
+# frame into it with the "raw" decoder, which also swaps BGR/BGRA to RGB on the
+# way (Picamera2's XRGB8888 frames are BGRA in memory, the X byte is dropped).
+# That is the only copy on the Python side; Tk copies the block into the photo.
+# Grayscale frames are expanded into a preallocated RGB buffer first, and frames
+# that already have the display size are not resized.
+class TkRenderer:
+    RAW_MODES = {3: "BGR", 4: "BGRX"}
+
+    def __init__(self, label, size=(640, 480)):
+        self.label = label
+        self.size = tuple(size)
+        width, height = self.size
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self.scaled = {}
+        self.image = Image.Image()._new(Image.core.new_block("RGB", self.size))
+        self.photo = ImageTk.PhotoImage("RGB", self.size)
+        self.label.configure(image=self.photo)
+        self.label.imgtk = self.photo
+        self.last_ms = 0.0
+
+    def show(self, frame):
+        start = time.perf_counter()
+        width, height = self.size
+        if frame.shape[1] != width or frame.shape[0] != height:
+            # One reusable buffer per channel layout for the resized frame
+            shape = (height, width) + frame.shape[2:]
+            if shape not in self.scaled:
+                self.scaled[shape] = np.empty(shape, dtype=np.uint8)
+            frame = cv2.resize(frame, self.size, dst=self.scaled[shape], interpolation=cv2.INTER_AREA)
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB, dst=self.rgb)
+            raw_mode = "RGB"
+        else:
+            raw_mode = self.RAW_MODES[frame.shape[2]]
+        self.image.frombytes(np.ascontiguousarray(frame), "raw", raw_mode)
+        self.photo.paste(self.image)
+        self.last_ms = (time.perf_counter() - start) * 1000.0
+        return self.last_ms
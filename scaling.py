@@ -0,0 +1,97 @@
+import time
+
+##############################
+# Adaptive detection scale
+##############################
+# Picks the detection downscale (cv_scaler) from a frame-time budget and the
+# size of recently detected faces. HOG detection cost grows with the number of
+# pixels it scans, so the controller keeps a running estimate of milliseconds
+# per detection pixel plus the rest of the frame time, and from that the finest
+# scale that still fits 1000 / target_fps. Recent faces then allow a coarser
+# scale: if the smallest face would still be `min_face` pixels tall after
+# downscaling, there is no need to scan more pixels than that.
+#
+# The rest of the frame time is measured per frame: tick() counts every
+# processed frame, so with tracking the interval between two detections is
+# divided by the frames it covered. pause() forgets the current interval, e.g.
+# while the motion gate skips frames, so idle time never counts as frame cost.
+#
+# A new scale is only adopted after `patience` consecutive decisions agree, so
+# one slow frame doesn't make the scale oscillate.
+class AdaptiveScaler:
+    def __init__(self, target_fps=10.0, levels=(1, 1.5, 2, 3, 4, 6), initial=4, min_face=48,
+                 face_memory=3.0, smoothing=0.2, patience=3):
+        self.target_fps = target_fps
+        self.levels = sorted(levels)
+        self.scaler = min(self.levels, key=lambda level: abs(level - initial))
+        self.min_face = min_face
+        self.face_memory = face_memory
+        self.smoothing = smoothing
+        self.patience = patience
+        self.ms_per_pixel = None
+        self.other_ms = None
+        self.faces = []
+        self.last_call = None
+        self.frames = 0
+        self.proposal = None
+        self.votes = 0
+
+    def _smooth(self, old, new):
+        return new if old is None else old + self.smoothing * (new - old)
+
+    def tick(self):
+        # Called once for every processed frame, detection or not
+        self.frames += 1
+
+    def pause(self):
+        self.last_call = None
+        self.frames = 0
+
+    def observe(self, detect_ms, detect_pixels, face_heights, now=None):
+        # Called after a detection: detect_ms spent on detect_pixels pixels, face heights in full-frame pixels
+        now = time.monotonic() if now is None else now
+        if detect_pixels:
+            self.ms_per_pixel = self._smooth(self.ms_per_pixel, detect_ms / detect_pixels)
+        if self.last_call is not None and self.frames:
+            # Time between two detection frames minus the detection itself (capture, track, encode,
+            # draw, ...), spread over the frames processed in between
+            self.other_ms = self._smooth(self.other_ms, max(0.0, (now - self.last_call) * 1000.0 - detect_ms) / self.frames)
+        self.last_call = now
+        self.frames = 0
+        self.faces = [(t, h) for t, h in self.faces if now - t <= self.face_memory]
+        self.faces.extend((now, h) for h in face_heights)
+
+    def budget_scaler(self, frame_pixels):
+        # Finest scale whose predicted detection frame time fits the budget
+        if self.ms_per_pixel is None:
+            return self.scaler
+        budget = 1000.0 / self.target_fps - (self.other_ms or 0.0)
+        for level in self.levels:
+            if self.ms_per_pixel * frame_pixels / (level * level) <= budget:
+                return level
+        return self.levels[-1]
+
+    def face_scaler(self):
+        # Coarsest scale that keeps the smallest recent face at least min_face pixels tall
+        if not self.faces:
+            return None
+        smallest = min(h for _, h in self.faces)
+        fitting = [level for level in self.levels if smallest / level >= self.min_face]
+        return fitting[-1] if fitting else self.levels[0]
+
+    def choose(self, frame_shape):
+        height, width = frame_shape[:2]
+        proposal = self.budget_scaler(width * height)
+        face_level = self.face_scaler()
+        if face_level is not None and face_level > proposal:
+            proposal = face_level
+        if proposal == self.scaler:
+            self.proposal, self.votes = None, 0
+        elif proposal == self.proposal:
+            self.votes += 1
+            if self.votes >= self.patience:
+                self.scaler = proposal
+                self.proposal, self.votes = None, 0
+        else:
+            self.proposal, self.votes = proposal, 1
+        return self.scaler
@@ -1,7 +1,6 @@
 import time
 import requests
 from datetime import datetime
-from pathlib import Path
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -12,71 +11,9 @@ import tkinter as tk
 from tkinter import messagebox
 from PIL import Image, ImageTk
 import io
-import mysql.connector
-
-##############################
-# Save image to dataset folder
-##############################
-def save_image_for_model(name, image_bytes):
-    dataset_dir = Path("dataset") / name
-    dataset_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = dataset_dir / f"{timestamp}.jpg"
-    with open(filename, "wb") as f:
-        f.write(image_bytes)
-    print(f"[SAVE] Image saved to {filename}")
-
-##############################
-# Database Manager
-##############################
-class DatabaseManager:
-    def __init__(self, host='localhost', user='root', password='Right1234', database='face_recognition_db'):
-        self.cnx = mysql.connector.connect(host=host, user=user, password=password)
-        self.cnx.autocommit = True
-        self.cursor = self.cnx.cursor()
-        self.database = database
-        self.create_database()
-        self.cnx.database = database
-        self.create_tables()
-    
-    def create_database(self):
-        self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
-    
-    def create_tables(self):
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS persons (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            occupation VARCHAR(255),
-            age VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )""")
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS images (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            person_id INT,
-            filename VARCHAR(255),
-            image LONGBLOB,
-            timestamp DATETIME,
-            FOREIGN KEY (person_id) REFERENCES persons(id)
-        )""")
-
-    def add_person(self, name, occupation, age):
-        self.cursor.execute("SELECT id FROM persons WHERE name = %s", (name,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        else:
-            self.cursor.execute("INSERT INTO persons (name, occupation, age) VALUES (%s, %s, %s)", (name, occupation, age))
-            return self.cursor.lastrowid
-    
-    def add_image(self, person_id, filename, image_data, timestamp):
-        self.cursor.execute("INSERT INTO images (person_id, filename, image, timestamp) VALUES (%s, %s, %s, %s)", 
-                            (person_id, filename, image_data, timestamp))
-    
-    def close(self):
-        self.cursor.close()
-        self.cnx.close()
+# Same pooled database and enrollment path as the Scrape page of main_app.py
+from main_app import DatabaseManager
+from enrollment import deduplicator_from_config
 
 ##############################
 # LinkedIn Scraper
@@ -87,6 +24,7 @@ class LinkedInScraper:
         self.email = email
         self.password = password
         self.db_manager = db_manager
+        self.deduplicator = deduplicator_from_config(db_manager)
 
         options = webdriver.ChromeOptions()
         options.add_argument('--no-sandbox')
@@ -153,7 +91,7 @@ class LinkedInScraper:
                 print(f"Skipping {name} due to missing image.")
                 continue
             root = tk.Tk()
-            app = ProfileReviewer(root, name, occupation, age, image_bytes, self.db_manager)
+            app = ProfileReviewer(root, name, occupation, age, image_bytes, self.deduplicator)
             root.mainloop()
 
     def close(self):
@@ -163,13 +101,13 @@ class LinkedInScraper:
 # Tkinter UI to Confirm Profile Info
 ##############################
 class ProfileReviewer:
-    def __init__(self, root, name, occupation, age, image_bytes, db_manager):
+    def __init__(self, root, name, occupation, age, image_bytes, deduplicator):
         self.root = root
         self.name = name
         self.occupation = occupation
         self.age = age
         self.image_bytes = image_bytes
-        self.db_manager = db_manager
+        self.deduplicator = deduplicator
 
         self.root.title("Confirm Profile Info")
 
@@ -207,13 +145,21 @@ class ProfileReviewer:
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         filename = f"{name}_{timestamp}.jpg"
-        person_id = self.db_manager.add_person(name, occupation, age)
-        self.db_manager.add_image(person_id, filename, self.image_bytes, timestamp)
-
-        # Save image to filesystem for model training
-        save_image_for_model(name, self.image_bytes)
-
-        messagebox.showinfo("Success", f"{name} added to database.")
+        # Enrollment (dedup checks, detection, encoding) runs on the deduplicator's thread;
+        # the window stays open until the result is handed back to the Tk loop
+        self.add_button.config(state=tk.DISABLED, text="Adding...")
+
+        def done(image_id, reason, error):
+            self.root.after(0, lambda: self.on_added(name, reason, error))
+        self.deduplicator.submit(name, occupation, age, filename, self.image_bytes, timestamp, done)
+
+    def on_added(self, name, reason, error):
+        if error:
+            messagebox.showerror("Error", f"Error adding profile {name}: {error}")
+        elif reason:
+            messagebox.showinfo("Skipped", f"Photo of {name} not added: {self.deduplicator.describe(reason)}.")
+        else:
+            messagebox.showinfo("Success", f"{name} added to database.")
         self.root.destroy()
 
 ##############################
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import config
+
+##############################
+# Announcer
+##############################
+# Speaks recognized names on a worker thread fed by a blocking queue.Queue.
+#  - Each identity is announced at most once per `cooldown` seconds, and an
+#    identity that is already waiting in the queue is not queued again.
+#  - The backlog is capped at `max_backlog`: when it is full the oldest
+#    announcement is dropped, and anything that waited longer than `max_age`
+#    seconds is skipped instead of spoken late.
+#  - With a `cache_dir`, every message is synthesized once to a WAV file
+#    (pyttsx3 save_to_file) and played with `player` (aplay) afterwards.
+# Backlog, queue wait and synthesis/playback time go to `metrics` (a
+# LatencyMetrics) if one is given.
+class Announcer:
+    def __init__(self, rate=150, cooldown=30.0, max_backlog=3, max_age=10.0, cache_dir=None, player="aplay", metrics=None):
+        self.rate = rate
+        self.cooldown = cooldown
+        self.max_age = max_age
+        self.cache_dir = cache_dir
+        self.player = shutil.which(player) if player else None
+        self.metrics = metrics
+        self.queue = queue.Queue(maxsize=max_backlog)
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.last_announced = {}
+        self.engine = None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def announce(self, key, message):
+        # Returns True if the message was queued
+        now = time.monotonic()
+        with self.lock:
+            last = self.last_announced.get(key)
+            if key in self.pending or (last is not None and now - last < self.cooldown):
+                return False
+            self.last_announced[key] = now
+            self.pending.add(key)
+        item = (key, message, now)
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    dropped = self.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._done(dropped[0], "dropped")
+        self._report()
+        return True
+
+    def stop(self):
+        self.queue.put(None)
+
+    def _done(self, key, outcome):
+        with self.lock:
+            self.pending.discard(key)
+            if outcome in ("dropped", "stale"):
+                # Never spoken, so don't hold the cooldown against this person
+                self.last_announced.pop(key, None)
+
+    def _report(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge("speech_backlog", self.queue.qsize())
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            key, message, queued_at = item
+            waited = time.monotonic() - queued_at
+            self._report()
+            if self.max_age and waited > self.max_age:
+                self._done(key, "stale")
+                continue
+            start = time.perf_counter()
+            try:
+                cached = self._speak(message)
+            except Exception as e:
+                print(f"[Speech ERROR] {e}")
+                self._done(key, "dropped")
+                continue
+            self._done(key, "spoken")
+            if self.metrics is not None:
+                self.metrics.observe("speech_wait", waited * 1000.0)
+                self.metrics.observe("speech_say", (time.perf_counter() - start) * 1000.0)
+
+    def _speak(self, message):
+        # Returns True if pre-rendered audio was reused
+        if self.engine is None:
+            # pyttsx3 engines must stay on the thread that created them
+            import pyttsx3
+            self.engine = pyttsx3.init(driverName='espeak')
+            self.engine.setProperty('rate', self.rate)
+        if not (self.cache_dir and self.player):
+            self.engine.say(message)
+            self.engine.runAndWait()
+            return False
+        digest = hashlib.sha1(f"{self.rate}:{message}".encode()).hexdigest()
+        path = os.path.join(self.cache_dir, f"{digest}.wav")
+        cached = os.path.exists(path)
+        if not cached:
+            tmp_path = path + ".tmp.wav"
+            self.engine.save_to_file(message, tmp_path)
+            self.engine.runAndWait()
+            os.replace(tmp_path, path)
+        subprocess.run([self.player, "-q", path], check=False)
+        return cached
+
+# === Build an announcer with the settings from config.py ===
+def announcer_from_config(metrics=None):
+    return Announcer(rate=config.SPEECH_RATE, cooldown=config.SPEECH_COOLDOWN, max_backlog=config.SPEECH_MAX_BACKLOG,
+                     max_age=config.SPEECH_MAX_AGE, cache_dir=config.SPEECH_CACHE_DIR, player=config.SPEECH_PLAYER,
+                     metrics=metrics)
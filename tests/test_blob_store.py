@@ -0,0 +1,88 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+import pytest
+import config
+from blob_store import BlobStore
+
+def test_round_trip(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    data = b"\xff\xd8 not really a jpeg"
+    content_hash = store.put(data)
+    assert content_hash == BlobStore.hash(data)
+    assert store.get(content_hash) == data
+    # Sharded by the first bytes of the hash
+    assert store.path(content_hash) == os.path.join(store.root, content_hash[:2], content_hash[2:4], content_hash)
+
+def test_same_bytes_are_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    assert store.put(b"photo") == store.put(b"photo")
+    assert store.put(b"photo") != store.put(b"other photo")
+    files = [name for _, _, names in os.walk(store.root) for name in names]
+    # No temporary files are left behind
+    assert sorted(files) == sorted([BlobStore.hash(b"photo"), BlobStore.hash(b"other photo")])
+
+def test_missing_blob_raises_oserror(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    with pytest.raises(OSError):
+        store.get(BlobStore.hash(b"never stored"))
+
+# === Moving LONGBLOBs out of MySQL ===
+# DatabaseManager.move_blobs runs against SQLite here; the queries only differ in the paramstyle.
+class SqliteCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=()):
+        self.cursor.execute(query.replace("%s", "?"), params)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    main_app = pytest.importorskip("main_app")
+    monkeypatch.setattr(config, "DB_FETCH_BATCH", 2)
+    db = sqlite3.connect(":memory:", isolation_level=None)
+    db.execute("CREATE TABLE images (id INTEGER PRIMARY KEY, person_id INT, image BLOB, content_hash CHAR(64))")
+
+    @contextmanager
+    def cursor(transaction=False):
+        yield SqliteCursor(db.cursor())
+
+    manager = main_app.DatabaseManager.__new__(main_app.DatabaseManager)
+    manager.blobs = BlobStore(str(tmp_path / "blobs"))
+    manager.cursor = cursor
+    manager.migration_progress = (0, 0)
+    manager.db = db
+    return manager
+
+def test_move_blobs(manager):
+    photos = [f"photo {i}".encode() for i in range(5)]
+    for i, photo in enumerate(photos, 1):
+        manager.db.execute("INSERT INTO images (id, person_id, image) VALUES (?, 1, ?)", (i, photo))
+    # Already in the blob store, left alone
+    stored = manager.blobs.put(b"stored photo")
+    manager.db.execute("INSERT INTO images (id, person_id, content_hash) VALUES (6, 1, ?)", (stored,))
+    manager.move_blobs()
+    rows = manager.db.execute("SELECT id, image, content_hash FROM images ORDER BY id").fetchall()
+    assert [image for _, image, _ in rows] == [None] * 6
+    assert [content_hash for _, _, content_hash in rows] == [BlobStore.hash(photo) for photo in photos] + [stored]
+    assert [manager.blobs.get(content_hash) for _, _, content_hash in rows] == photos + [b"stored photo"]
+    assert manager.migration_progress == (5, 5)
+
+def test_move_blobs_resumes_after_interruption(manager):
+    photos = [f"photo {i}".encode() for i in range(3)]
+    for i, photo in enumerate(photos, 1):
+        manager.db.execute("INSERT INTO images (id, person_id, image) VALUES (?, 1, ?)", (i, photo))
+    # Interrupted after the blob was written, before its LONGBLOB was cleared
+    manager.blobs.put(photos[0])
+    manager.move_blobs()
+    manager.move_blobs()
+    rows = manager.db.execute("SELECT image, content_hash FROM images ORDER BY id").fetchall()
+    assert rows == [(None, BlobStore.hash(photo)) for photo in photos]
+    # The second run had nothing left to move
+    assert manager.migration_progress == (3, 3)
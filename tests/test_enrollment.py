@@ -0,0 +1,122 @@
+import os
+import threading
+import cv2
+import numpy as np
+import pytest
+from blob_store import BlobStore
+from enrollment import EnrollmentDeduplicator
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "dataset", "Bryant Van Orden")
+
+def photo(name):
+    with open(os.path.join(DATASET, name), "rb") as f:
+        return f.read()
+
+def recompressed(image_bytes, scale=0.5, quality=60):
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+# The DatabaseManager methods the deduplicator uses, kept in memory
+class FakeDatabase:
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.persons = {}
+        self.images = []
+        self.encodings = {}
+
+    def add_person(self, name, occupation, age):
+        return self.persons.setdefault(name, len(self.persons) + 1)
+
+    def add_image(self, person_id, filename, image_data, timestamp, phash=None):
+        content_hash = self.blobs.put(image_data) if image_data is not None else None
+        self.images.append({"id": len(self.images) + 1, "person_id": person_id, "content_hash": content_hash, "phash": phash})
+        return len(self.images), content_hash, True
+
+    def read_image(self, content_hash):
+        return self.blobs.get(content_hash)
+
+    def get_person_images(self, person_id):
+        return [(i["id"], i["content_hash"], i["phash"]) for i in self.images if i["person_id"] == person_id]
+
+    def set_image_phash(self, image_id, phash):
+        self.images[image_id - 1]["phash"] = phash
+
+    def get_person_encodings(self, person_id):
+        return np.asarray(self.encodings.get(person_id, []), dtype=np.float32).reshape(-1, 128)
+
+    def save_trained_image(self, image_id, person_id, content_hash, boxes, encodings):
+        self.encodings.setdefault(person_id, []).extend(encodings)
+
+@pytest.fixture
+def db(tmp_path):
+    return FakeDatabase(BlobStore(str(tmp_path / "blobs")))
+
+def enroll(deduplicator, db, image_bytes, name="Bryant"):
+    return deduplicator.enroll(db.add_person(name, "", 23), "photo.jpg", image_bytes, "2025-04-02 11:36:40")
+
+def test_exact_duplicate_is_skipped(db):
+    deduplicator = EnrollmentDeduplicator(db, check_encodings=False)
+    assert enroll(deduplicator, db, photo("2025-04-02_11-36-40.jpg"))[1] is None
+    # The dataset holds the same file twice under different names
+    assert enroll(deduplicator, db, photo("2025-04-02_11-42-05.jpg")) == (None, "exact")
+    assert deduplicator.counters == {"added": 1, "exact": 1, "perceptual": 0, "encoding": 0}
+    assert deduplicator.skipped() == 1
+
+def test_recompressed_copy_is_skipped(db):
+    deduplicator = EnrollmentDeduplicator(db, check_encodings=False)
+    original = photo("Bryant Van Orden_20250331_121610.jpg")
+    enroll(deduplicator, db, original)
+    assert enroll(deduplicator, db, recompressed(original)) == (None, "perceptual")
+
+def test_different_photos_and_other_persons_are_added(db):
+    deduplicator = EnrollmentDeduplicator(db, check_encodings=False)
+    for name in ("Bryant Van Orden_20250331_121610.jpg", "Bryant Van Orden_20250331_121617.jpg",
+                 "Bryant Van Orden_20250331_121626.jpg"):
+        assert enroll(deduplicator, db, photo(name))[1] is None
+    # Only the person's own samples are compared
+    assert enroll(deduplicator, db, photo("Bryant Van Orden_20250331_121610.jpg"), name="Someone else")[1] is None
+    assert deduplicator.counters["added"] == 4
+
+def test_legacy_rows(db):
+    deduplicator = EnrollmentDeduplicator(db, check_encodings=False)
+    person_id = db.add_person("Bryant", "", 23)
+    original = photo("Bryant Van Orden_20250331_121610.jpg")
+    # Not moved into the blob store yet, then a row whose blob is missing
+    db.add_image(person_id, "old.jpg", None, None)
+    db.images.append({"id": 2, "person_id": person_id, "content_hash": BlobStore.hash(b"lost"), "phash": None})
+    # Stored before perceptual hashes existed
+    db.add_image(person_id, "older.jpg", original, None)
+    assert enroll(deduplicator, db, recompressed(original)) == (None, "perceptual")
+    assert db.images[2]["phash"] is not None
+
+def test_face_already_in_gallery_is_skipped(db):
+    first = photo("Bryant Van Orden_20250331_121610.jpg")
+    second = photo("Bryant Van Orden_20250331_121626.jpg")
+    deduplicator = EnrollmentDeduplicator(db, encoding_distance=0.35)
+    assert enroll(deduplicator, db, first)[1] is None
+    # Encoded at enrollment, so training does not have to
+    assert db.get_person_encodings(1).shape == (1, 128)
+    assert enroll(deduplicator, db, second) == (None, "encoding")
+    # The same two faces are far enough apart with the default distance
+    assert enroll(EnrollmentDeduplicator(db, encoding_distance=0.2), db, second)[1] is None
+
+def test_submit_reports_from_the_worker(db):
+    deduplicator = EnrollmentDeduplicator(db, check_encodings=False)
+    results = []
+    finished = threading.Event()
+
+    def done(image_id, reason, error):
+        results.append((image_id, reason, error, threading.current_thread() is threading.main_thread()))
+        if len(results) == 3:
+            finished.set()
+    image = photo("2025-04-02_11-36-40.jpg")
+    deduplicator.submit("Bryant", "", 23, "a.jpg", image, None, done)
+    deduplicator.submit("Bryant", "", 23, "b.jpg", image, None, done)
+    # Fails on the worker (no bytes to hash) and is reported through done() as well
+    deduplicator.submit("Bryant", "", 23, "c.jpg", None, None, done)
+    assert finished.wait(10)
+    # Jobs run in order, so the second capture already sees the first
+    assert results[:2] == [(1, None, None, False), (None, "exact", None, False)]
+    image_id, reason, error, _ = results[2]
+    assert (image_id, reason) == (None, None) and isinstance(error, TypeError)
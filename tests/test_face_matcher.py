@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from face_matcher import FaceMatcher
+from gallery_index import build_index
+
+def gallery(identities=40, per_identity=10, spread=0.08, seed=0):
+    # Clusters of encodings around one random centre per identity
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.1, (identities, 128)).astype(np.float32)
+    ids = np.repeat(np.arange(identities), per_identity)
+    encodings = centres[ids] + rng.normal(0, spread / np.sqrt(128), (len(ids), 128)).astype(np.float32)
+    return encodings, ids, centres
+
+def queries(centres, count=100, spread=0.08, seed=1):
+    rng = np.random.default_rng(seed)
+    picked = rng.integers(0, len(centres), count)
+    return centres[picked] + rng.normal(0, spread / np.sqrt(128), (count, 128)).astype(np.float32)
+
+def brute_force(encodings, ids, query):
+    # (best row, distance, runner-up margin) straight from every distance
+    distances = np.linalg.norm(encodings - query, axis=1)
+    best = int(np.argmin(distances))
+    others = distances[ids != ids[best]]
+    return best, float(distances[best]), float(others.min() - distances[best]) if others.size else float("inf")
+
+def matcher(encodings, ids, **kwargs):
+    return FaceMatcher(encodings, [f"person{i}" for i in range(ids.max() + 1)], identity_ids=ids, **kwargs)
+
+def test_exact_margins_match_brute_force():
+    encodings, ids, centres = gallery()
+    probes = queries(centres)
+    results = matcher(encodings, ids, tolerance=10.0).match(probes)
+    for query, result in zip(probes, results):
+        best, distance, margin = brute_force(encodings, ids, query)
+        assert result.index == best
+        assert result.identity == ids[best]
+        assert result.distance == pytest.approx(distance, abs=1e-4)
+        assert result.margin == pytest.approx(margin, abs=1e-4)
+
+def test_ivf_margins_match_brute_force_when_every_list_is_probed():
+    encodings, ids, centres = gallery()
+    probes = queries(centres)
+    results = matcher(encodings, ids, tolerance=10.0, backend="ivf", index_params={"nlist": 8, "nprobe": 8}).match(probes)
+    for query, result in zip(probes, results):
+        best, distance, margin = brute_force(encodings, ids, query)
+        assert result.index == best
+        assert result.margin == pytest.approx(margin, abs=1e-4)
+
+def test_ivf_margin_never_below_brute_force():
+    # With few probes the runner-up may be missed (None) or a farther one found, never a closer one
+    encodings, ids, centres = gallery()
+    probes = queries(centres)
+    results = matcher(encodings, ids, tolerance=10.0, backend="ivf", index_params={"nlist": 20, "nprobe": 1},
+                      candidates=4).match(probes)
+    for query, result in zip(probes, results):
+        best, distance, margin = brute_force(encodings, ids, query)
+        if result.index == best and result.margin is not None:
+            assert result.margin >= margin - 1e-4
+
+def test_margin_is_inf_for_a_single_identity():
+    encodings, ids, centres = gallery(identities=1)
+    for backend in ("exact", "ivf"):
+        result, = matcher(encodings, ids, backend=backend).match(queries(centres, count=1))
+        assert result.identity == 0
+        assert result.margin == float("inf")
+
+def test_unknown_beyond_tolerance_keeps_distance_and_margin():
+    encodings, ids, centres = gallery()
+    result, = matcher(encodings, ids, tolerance=0.0).match(queries(centres, count=1))
+    assert (result.index, result.identity, result.name) == (-1, -1, "Unknown")
+    assert result.distance > 0 and result.margin is not None
+
+def test_empty_gallery():
+    results = FaceMatcher(np.empty((0, 128), np.float32), []).match(np.zeros((2, 128), np.float32))
+    assert [r.name for r in results] == ["Unknown", "Unknown"]
+
+def recall(encodings, probes, k, **params):
+    # (recall@1, recall@k) of the IVF index against the exact one
+    exact_i, _ = build_index(encodings, "exact").search(probes, k=k)
+    ivf_i, _ = build_index(encodings, "ivf", **params).search(probes, k=k)
+    return np.mean(exact_i[:, 0] == ivf_i[:, 0]), np.mean([len(set(a) & set(b)) / k for a, b in zip(exact_i, ivf_i)])
+
+def test_ivf_recall():
+    # Overlapping identities, so the nearest faces are often in a neighbouring list
+    encodings, ids, centres = gallery(identities=100, per_identity=20, spread=1.5)
+    probes = queries(centres, count=200, spread=1.5)
+    recall_at_1, recall_at_10 = recall(encodings, probes, 10, nlist=45, nprobe=8)
+    assert recall_at_1 >= 0.95
+    assert recall_at_10 >= 0.95
+    assert recall(encodings, probes, 10, nlist=45, nprobe=1)[1] < recall_at_10
+    assert recall(encodings, probes, 10, nlist=45, nprobe=45) == (1.0, 1.0)
+
+def test_ivf_probing_every_list_is_exact():
+    encodings, ids, centres = gallery()
+    probes = queries(centres)
+    exact_i, exact_d = build_index(encodings, "exact").search(probes, k=5)
+    ivf_i, ivf_d = build_index(encodings, "ivf", nlist=10, nprobe=10).search(probes, k=5)
+    assert (exact_i == ivf_i).all()
+    assert np.allclose(exact_d, ivf_d, atol=1e-4)
@@ -0,0 +1,66 @@
+import numpy as np
+from recognizer import FaceRecognizer, merge_windows
+
+# A "face" is a bright square on a dark frame. Like HOG, the fake detector finds
+# nothing in images smaller than its template, however clearly the face shows.
+class SquareDetector:
+    def __init__(self, template=80):
+        self.template = template
+        self.calls = []
+
+    def detect(self, rgb):
+        self.calls.append(rgb.shape[:2])
+        if min(rgb.shape[:2]) < self.template:
+            return []
+        ys, xs = np.nonzero(rgb[:, :, 0] > 128)
+        if not len(ys):
+            return []
+        return [(int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1, int(xs.min()))]
+
+def frame_with_face(box, size=(120, 160)):
+    frame = np.zeros(size + (3,), dtype=np.uint8)
+    top, right, bottom, left = box
+    frame[top:bottom, left:right] = 255
+    return frame
+
+def run(recognizer, frame, count):
+    # Detections the way recognize() chains them without tracking
+    results = []
+    for _ in range(count):
+        boxes = recognizer.detect(frame)
+        recognizer.last_boxes = boxes
+        results.append((recognizer.last_scan, boxes))
+    return results
+
+def test_static_face_stays_detected_across_roi_scans():
+    box = (40, 84, 76, 48)
+    detector = SquareDetector()
+    recognizer = FaceRecognizer(None, roi=True, roi_margin=0.5, full_scan_every=10, detector=detector)
+    results = run(recognizer, frame_with_face(box), 12)
+    assert [scan for scan, _ in results] == ["full"] + ["roi"] * 9 + ["full", "roi"]
+    assert all(len(boxes) == 1 for _, boxes in results)
+    for _, boxes in results:
+        assert max(abs(a - b) for a, b in zip(boxes[0], box)) <= 1
+    # The 72x72 window was upscaled to the detector's template
+    assert min(detector.calls[1]) >= 80
+
+def test_missed_roi_scan_falls_back_to_full_scan_in_same_frame():
+    box = (40, 84, 76, 48)
+    detector = SquareDetector()
+    # Without upscaling every window is below the template and finds nothing
+    recognizer = FaceRecognizer(None, roi=True, roi_min_size=1, detector=detector)
+    results = run(recognizer, frame_with_face(box), 5)
+    assert all(scan == "full" and len(boxes) == 1 for scan, boxes in results)
+    # Each later frame tried its window first, then the whole frame
+    assert detector.calls[1:3] == [(72, 72), (120, 160)]
+
+def test_merge_windows():
+    assert merge_windows([]) == []
+    assert merge_windows([(0, 10, 10, 0), (20, 30, 30, 20)]) == [(0, 10, 10, 0), (20, 30, 30, 20)]
+    assert merge_windows([(0, 10, 10, 0), (5, 15, 15, 5)]) == [(0, 15, 15, 0)]
+    # Windows that only touch are kept apart
+    assert merge_windows([(0, 10, 10, 0), (10, 20, 20, 10)]) == [(0, 10, 10, 0), (10, 20, 20, 10)]
+    # Chains merge into one window
+    assert merge_windows([(0, 10, 10, 0), (20, 30, 30, 20), (5, 25, 25, 5)]) == [(0, 30, 30, 0)]
+    # The third window overlaps neither of the others, only their union
+    assert merge_windows([(0, 10, 10, 0), (0, 30, 4, 8), (5, 30, 30, 20)]) == [(0, 30, 30, 0)]
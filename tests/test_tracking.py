@@ -0,0 +1,52 @@
+from face_matcher import MatchResult
+from tracking import IdentityCache
+
+BOX = (10, 60, 60, 10)
+
+def match(name, distance=0.5, index=0):
+    return MatchResult(index, 0 if name == "alice" else 1, name, distance, 0.1)
+
+def test_identity_needs_votes_before_it_is_cached():
+    cache = IdentityCache(min_votes=2, confident_distance=0.3)
+    assert cache.store(1, BOX, None, match("alice"), now=0.0).name == "alice"
+    assert not cache.is_stable(1)
+    assert cache.lookup(1, BOX, now=0.1) is None
+    cache.store(1, BOX, None, match("alice"), now=0.2)
+    assert cache.is_stable(1)
+    assert cache.lookup(1, BOX, now=0.3).name == "alice"
+
+def test_confident_match_is_stable_at_once():
+    cache = IdentityCache(min_votes=3, confident_distance=0.3)
+    cache.store(1, BOX, None, match("alice", distance=0.25), now=0.0)
+    assert cache.is_stable(1)
+    assert cache.lookup(1, BOX, now=0.1).name == "alice"
+
+def test_majority_of_the_window_wins():
+    cache = IdentityCache(window=3, min_votes=2, confident_distance=0.0)
+    votes = ["alice", "bob", "alice", "bob", "bob"]
+    voted = [cache.store(1, BOX, None, match(name, distance=0.4 + i / 100), now=i).name for i, name in enumerate(votes)]
+    # The window only keeps the last 3 votes, so bob takes over after the fourth
+    assert voted == ["alice", "alice", "alice", "bob", "bob"]
+    # The most recent match of the winning identity is reported
+    assert cache.lookup(1, BOX, now=4.5).distance == 0.44
+
+def test_entry_expires_after_ttl():
+    cache = IdentityCache(ttl=2.0, min_votes=1)
+    cache.store(1, BOX, None, match("alice"), now=10.0)
+    assert cache.lookup(1, BOX, now=12.0) is not None
+    assert cache.lookup(1, BOX, now=12.1) is None
+
+def test_moved_box_is_re_encoded():
+    cache = IdentityCache(move_iou=0.6, min_votes=1)
+    cache.store(1, BOX, None, match("alice"), now=0.0)
+    assert cache.lookup(1, (12, 62, 62, 12), now=0.1) is not None
+    assert cache.lookup(1, (30, 80, 80, 30), now=0.1) is None
+
+def test_prune_and_rescale():
+    cache = IdentityCache(min_votes=1)
+    cache.store(1, BOX, None, match("alice"), now=0.0)
+    cache.store(2, BOX, None, match("bob"), now=0.0)
+    cache.prune({2})
+    assert not cache.is_stable(1)
+    cache.rescale(2.0)
+    assert cache.lookup(2, (20, 120, 120, 20), now=0.1).name == "bob"
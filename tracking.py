@@ -0,0 +1,171 @@
+import itertools
+from collections import Counter, deque
+import cv2
+import numpy as np
+
+##############################
+# Face Tracking
+##############################
+# Boxes are (top, right, bottom, left) like face_recognition.face_locations,
+# in the coordinates of the downscaled detection frame.
+
+def iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+class Track:
+    _ids = itertools.count(1)
+
+    def __init__(self, box):
+        self.id = next(Track._ids)
+        self.box = tuple(int(v) for v in box)
+        self.match = None
+        self.confidence = 0.0
+        self.misses = 0
+        self.announced = None
+
+    def assign(self, match):
+        self.match = match
+        self.confidence = 1.0
+
+class FaceTracker:
+    # Full detection runs every `detect_every` frames or as soon as a track is lost.
+    # In between, each box is moved by the median Lucas-Kanade optical flow of the
+    # corner points inside it. A track keeps its identity until its confidence has
+    # decayed below `min_confidence`, then it is re-identified on the next detection.
+    # Tracks listed in `refresh` (e.g. identities that are not stable yet) are
+    # re-identified on every detection regardless of their confidence.
+    def __init__(self, detect_every=5, iou_threshold=0.3, confidence_decay=0.95, min_confidence=0.5, max_misses=2):
+        self.detect_every = detect_every
+        self.iou_threshold = iou_threshold
+        self.confidence_decay = confidence_decay
+        self.min_confidence = min_confidence
+        self.max_misses = max_misses
+        self.tracks = []
+        self.prev_gray = None
+        self.frames_since_detection = 0
+        self.lost = False
+
+    def needs_detection(self):
+        return self.prev_gray is None or self.lost or self.frames_since_detection + 1 >= self.detect_every
+
+    def update(self, gray, detections, refresh=()):
+        # Associate fresh detections with existing tracks by IoU (greedy, best pairs first).
+        # Returns the tracks whose identity has to be (re)computed.
+        pairs = sorted(((iou(t.box, d), ti, di) for ti, t in enumerate(self.tracks) for di, d in enumerate(detections)), reverse=True)
+        used_tracks, used_detections = set(), set()
+        tracks = []
+        for overlap, ti, di in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if ti in used_tracks or di in used_detections:
+                continue
+            used_tracks.add(ti)
+            used_detections.add(di)
+            track = self.tracks[ti]
+            track.box = tuple(int(v) for v in detections[di])
+            track.misses = 0
+            track.confidence *= self.confidence_decay
+            tracks.append(track)
+        tracks.extend(Track(d) for di, d in enumerate(detections) if di not in used_detections)
+        self.tracks = tracks
+        self.prev_gray = gray
+        self.frames_since_detection = 0
+        self.lost = False
+        return [t for t in self.tracks if t.match is None or t.confidence < self.min_confidence or t.id in refresh]
+
+    def rescale(self, factor):
+        # The detection scale changed: move boxes into the new frame size and
+        # drop the previous frame, which no longer matches (forces a detection)
+        for track in self.tracks:
+            track.box = tuple(int(round(v * factor)) for v in track.box)
+        self.prev_gray = None
+
+    def propagate(self, gray):
+        height, width = gray.shape[:2]
+        alive = []
+        for track in self.tracks:
+            top, right, bottom, left = track.box
+            mask = np.zeros_like(self.prev_gray)
+            mask[max(0, top):max(0, bottom), max(0, left):max(0, right)] = 255
+            points = cv2.goodFeaturesToTrack(self.prev_gray, maxCorners=20, qualityLevel=0.01, minDistance=3, mask=mask)
+            moved = None
+            if points is not None:
+                new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None)
+                good = status.reshape(-1) == 1
+                if good.sum() >= 3:
+                    dx, dy = np.median((new_points - points).reshape(-1, 2)[good], axis=0)
+                    moved = (int(round(dy)), int(round(dx)))
+            if moved is None:
+                track.misses += 1
+            else:
+                dy, dx = moved
+                dy = int(np.clip(dy, -top, height - bottom))
+                dx = int(np.clip(dx, -left, width - right))
+                track.box = (top + dy, right + dx, bottom + dy, left + dx)
+                track.misses = 0
+            track.confidence *= self.confidence_decay
+            if track.misses > self.max_misses:
+                self.lost = True
+            else:
+                alive.append(track)
+        self.tracks = alive
+        self.prev_gray = gray
+        self.frames_since_detection += 1
+        return self.tracks
+
+##############################
+# Identity Cache
+##############################
+# Remembers the last encoding and identity of every track. A track whose box has
+# barely moved (IoU with the cached box >= `move_iou`) reuses its identity until
+# `ttl` seconds have passed, so a static subject is not re-encoded every time.
+# Every fresh match is a vote; the reported identity is the majority of the last
+# `window` votes, and it only counts as stable once it has `min_votes` of them,
+# or straight away if the match is within `confident_distance`.
+class IdentityCache:
+    def __init__(self, ttl=2.0, move_iou=0.6, window=5, min_votes=2, confident_distance=0.45):
+        self.ttl = ttl
+        self.move_iou = move_iou
+        self.window = window
+        self.min_votes = min_votes
+        self.confident_distance = confident_distance
+        self.entries = {}
+
+    def lookup(self, track_id, box, now):
+        entry = self.entries.get(track_id)
+        # Keep voting with fresh encodings until the identity is stable
+        if entry is None or not entry["stable"] or now - entry["time"] > self.ttl or iou(entry["box"], box) < self.move_iou:
+            return None
+        return entry["match"]
+
+    def store(self, track_id, box, encoding, match, now):
+        entry = self.entries.setdefault(track_id, {"votes": deque(maxlen=self.window)})
+        entry["votes"].append(match)
+        counts = Counter(vote.name for vote in entry["votes"])
+        name, votes = counts.most_common(1)[0]
+        # Report the most recent match of the winning identity
+        voted = next(vote for vote in reversed(entry["votes"]) if vote.name == name)
+        confident = voted.index >= 0 and voted.distance <= self.confident_distance
+        entry.update(box=box, encoding=encoding, match=voted, time=now, stable=votes >= self.min_votes or confident)
+        return voted
+
+    def rescale(self, factor):
+        for entry in self.entries.values():
+            if "box" in entry:
+                entry["box"] = tuple(int(round(v * factor)) for v in entry["box"])
+
+    def is_stable(self, track_id):
+        entry = self.entries.get(track_id)
+        return bool(entry and entry.get("stable"))
+
+    def prune(self, live_track_ids):
+        for track_id in list(self.entries):
+            if track_id not in live_track_ids:
+                del self.entries[track_id]
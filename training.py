@@ -0,0 +1,117 @@
+import os
+import collections
+import itertools
+import multiprocessing
+import cv2
+import numpy as np
+from detectors import detector_from_config
+from encoding import BatchEncoder
+from blob_store import map_file
+import config
+
+##############################
+# Parallel Training Engine
+##############################
+# Decoding, detection (config.TRAIN_DETECTOR) and encoding of every image run in a process pool.
+# Each task is a chunk of `chunksize` images whose faces are encoded in one batch
+# (see encoding.BatchEncoder). Results are streamed back in input order so callers
+# can report progress and assemble the same encodings/names lists as the old
+# single-core loop.
+
+# Detector and encoder of this process, built once (YuNet/Haar load a model file)
+_worker = {}
+
+def _setup(detector=None):
+    _worker["detector"] = detector_from_config(detector or config.TRAIN_DETECTOR)
+    _worker["encoder"] = BatchEncoder(batch_size=config.ENCODE_BATCH_SIZE)
+
+def _init_worker(detector=None):
+    # One OpenCV thread per process, the pool already uses every core
+    cv2.setNumThreads(1)
+    _setup(detector)
+
+def _decode(source):
+    # `source` is either a path on disk (dataset/ folder, blob store) or encoded image bytes
+    if isinstance(source, str) and config.TRAIN_MMAP:
+        # Blob store files (and dataset/ photos) are decoded straight from a memory map
+        try:
+            mapped = map_file(source)
+        except (OSError, ValueError):
+            return None
+        try:
+            image = cv2.imdecode(np.frombuffer(mapped, np.uint8), cv2.IMREAD_COLOR)
+        finally:
+            mapped.close()
+    elif isinstance(source, str):
+        image = cv2.imread(source)
+    else:
+        image = cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_COLOR)
+    return None if image is None else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def encode_batch(sources):
+    # [(boxes, encodings), ...] for a list of sources, all faces encoded together
+    if "detector" not in _worker:
+        _setup()
+    items = []
+    for source in sources:
+        rgb = _decode(source)
+        items.append((rgb, _worker["detector"].detect(rgb) if rgb is not None else []))
+    found = [(rgb, boxes) for rgb, boxes in items if boxes]
+    encodings = iter(_worker["encoder"].encode_many(found))
+    return [(boxes, next(encodings) if boxes else []) for _, boxes in items]
+
+def encode_image(source):
+    return encode_batch([source])[0]
+
+def _chunks(sources, chunksize):
+    sources = iter(sources)
+    while True:
+        chunk = list(itertools.islice(sources, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+def encode_images(sources, workers=None, progress=None, chunksize=8, detector=None, total=None):
+    # Yields (boxes, encodings) found in each source, in the same order as `sources`.
+    # progress(done, total) is called after every image.
+    # `sources` may be a generator (e.g. images streamed from the database) if `total`
+    # is given; it is only read a few chunks ahead of the results, so no more than
+    # about 2 * workers chunks of images are held in memory at once.
+    total = len(sources) if total is None else total
+    workers = workers or os.cpu_count() or 1
+    # Smaller chunks when there are few images, so every worker still gets some
+    chunksize = max(1, min(chunksize, -(-total // workers)))
+    chunks = _chunks(sources, chunksize)
+    workers = min(workers, -(-total // chunksize))
+    if workers <= 1:
+        _setup(detector)
+        results = map(encode_batch, chunks)
+        pool = None
+    else:
+        # apply_async with a bounded window instead of imap, whose feeder thread
+        # would pull every chunk out of `sources` straight away
+        # Workers come from a forkserver instead of fork(): the Train page calls this from a
+        # background thread while capture, inference and speech threads may hold locks
+        pool = multiprocessing.get_context("forkserver").Pool(workers, initializer=_init_worker, initargs=(detector,))
+        results = _bounded(pool, chunks, 2 * workers)
+    try:
+        done = 0
+        for chunk in results:
+            for result in chunk:
+                done += 1
+                if progress:
+                    progress(done, total)
+                yield result
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
+def _bounded(pool, chunks, window):
+    in_flight = collections.deque()
+    for chunk in chunks:
+        in_flight.append(pool.apply_async(encode_batch, (chunk,)))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().get()
+    while in_flight:
+        yield in_flight.popleft().get()